@@ -0,0 +1,304 @@
+"""
+本地模拟语音识别服务器模块
+在本机模拟OpenAI转录接口与阿里云DashScope实时识别协议，可配置延迟、抖动、错误率和新建连接开销，
+供基准测试在不访问真实服务的情况下运行完整流水线
+
+路由:
+  POST /v1/audio/transcriptions   OpenAI兼容转录接口（返回纯文本）
+  /api-ws/v1/inference            DashScope WebSocket双工识别协议
+"""
+import asyncio
+import json
+import random
+import threading
+import uuid
+from subtitle_server import (
+    read_http_request, websocket_handshake_response,
+    encode_websocket_frame, read_websocket_frame
+)
+
+OPENAI_PATH = '/v1/audio/transcriptions'
+DASHSCOPE_PATH = '/api-ws/v1/inference'
+
+# Seconds of audio per final sentence in the DashScope emulation
+SENTENCE_DURATION = 2.0
+
+
+class StubASRServer:
+    """Stand-in ASR server with configurable latency, jitter and error rate
+
+    Each OpenAI request and each DashScope result is delayed by
+    ``latency_ms`` plus a uniform random ``±jitter_ms``. A request (HTTP
+    request or recognition task) fails with probability ``error_rate``.
+    Like SubtitleServer, the server runs its own asyncio loop on a daemon
+    thread; pass port 0 to pick a free port.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 300,
+                 jitter_ms: float = 0, error_rate: float = 0.0, seed: int = None,
+                 connect_ms: float = 0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        # Extra delay on the first request of each connection (stands in for DNS/TLS setup)
+        self.connect_ms = connect_ms
+        self.random = random.Random(seed)
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self._started = threading.Event()
+        self._start_error = None
+
+        # 统计信息
+        self.requests = 0
+        self.errors_injected = 0
+        self.audio_bytes = 0
+        self.connections = 0
+
+    # ---- public API (any thread) ----
+
+    @property
+    def openai_base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    @property
+    def dashscope_url(self) -> str:
+        return f"ws://{self.host}:{self.port}{DASHSCOPE_PATH}"
+
+    def start(self):
+        """Start the server thread and wait until it is listening"""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._run, name='asr-stub-server', daemon=True)
+        self.thread.start()
+        self._started.wait(timeout=5)
+        if self._start_error is not None:
+            self.thread = None
+            raise self._start_error
+
+    def stop(self):
+        """Stop the server and drop all connections"""
+        if self.loop is None or self.thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2)
+        self.thread = None
+
+    def get_stats(self):
+        """获取模拟服务器统计信息"""
+        return {
+            'requests': self.requests,
+            'errors_injected': self.errors_injected,
+            'audio_bytes': self.audio_bytes,
+            'connections': self.connections,
+        }
+
+    # ---- event loop side ----
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle_connection, self.host, self.port)
+            )
+            self.port = self.server.sockets[0].getsockname()[1]
+        except Exception as e:
+            self._start_error = e
+            self.loop.close()
+            self.loop = None
+            self._started.set()
+            return
+
+        self._started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loop.close()
+            self.loop = None
+
+    def _delay(self) -> float:
+        """Simulated service time in seconds"""
+        jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(self.latency_ms + jitter, 0) / 1000
+
+    def _should_fail(self) -> bool:
+        if self.error_rate > 0 and self.random.random() < self.error_rate:
+            self.errors_injected += 1
+            return True
+        return False
+
+    async def _handle_connection(self, reader, writer):
+        self.connections += 1
+        first_request = True
+        try:
+            # HTTP/1.1 keep-alive: the OpenAI client reuses connections
+            while True:
+                method, path, headers = await read_http_request(reader)
+                if not method:
+                    break
+                if first_request and self.connect_ms:
+                    await asyncio.sleep(self.connect_ms / 1000)
+                first_request = False
+                if path == DASHSCOPE_PATH and headers.get('upgrade', '').lower() == 'websocket':
+                    await self._serve_dashscope(reader, writer, headers)
+                    break
+                body = await self._read_body(reader, headers)
+                if method == 'POST' and path == OPENAI_PATH:
+                    await self._serve_openai(writer, body)
+                else:
+                    self._write_response(writer, '404 Not Found', 'text/plain', b'Not Found')
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_body(self, reader, headers) -> bytes:
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    # Trailer section ends with an empty line
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    return bytes(body)
+                body += await reader.readexactly(size)
+                await reader.readline()
+        length = int(headers.get('content-length', 0))
+        return await reader.readexactly(length) if length else b''
+
+    def _write_response(self, writer, status, content_type, body):
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+
+    # ---- OpenAI ----
+
+    async def _serve_openai(self, writer, body):
+        self.requests += 1
+        self.audio_bytes += len(body)
+        await asyncio.sleep(self._delay())
+        if self._should_fail():
+            error = {'error': {'message': 'Injected failure', 'type': 'server_error'}}
+            self._write_response(writer, '500 Internal Server Error', 'application/json',
+                                 json.dumps(error).encode('utf-8'))
+            return
+        text = f"模拟字幕 {self.requests}"
+        self._write_response(writer, '200 OK', 'text/plain; charset=utf-8', text.encode('utf-8'))
+
+    # ---- DashScope ----
+
+    async def _serve_dashscope(self, reader, writer, headers):
+        writer.write(websocket_handshake_response(headers))
+        await writer.drain()
+
+        # Results are released in order through one queue, each no earlier than its due time
+        outbox = asyncio.Queue()
+        sender = asyncio.ensure_future(self._dashscope_sender(writer, outbox))
+        task_id = None
+        sample_rate = 16000
+        sentence_id = 0
+        sentence_bytes = 0
+        sentence_start_ms = 0
+        position_ms = 0
+        last_due = 0.0
+
+        def schedule(message):
+            nonlocal last_due
+            last_due = max(self.loop.time() + self._delay(), last_due)
+            outbox.put_nowait((last_due, message))
+
+        def sentence(text, end):
+            return self._dashscope_event(task_id, 'result-generated', {
+                'output': {'sentence': {
+                    'sentence_id': sentence_id,
+                    'begin_time': sentence_start_ms,
+                    'end_time': position_ms if end else None,
+                    'text': text,
+                    'words': [],
+                }},
+            })
+
+        try:
+            while True:
+                opcode, payload = await read_websocket_frame(reader)
+                if opcode == 0x8:  # close
+                    writer.write(encode_websocket_frame(payload[:2], opcode=0x8))
+                    await writer.drain()
+                    return
+                if opcode == 0x9:  # ping
+                    writer.write(encode_websocket_frame(payload, opcode=0xA))
+                    await writer.drain()
+                    continue
+
+                if opcode == 0x2:  # binary audio frame
+                    if task_id is None:
+                        continue
+                    self.audio_bytes += len(payload)
+                    sentence_bytes += len(payload)
+                    position_ms = sentence_start_ms + sentence_bytes * 1000 // (sample_rate * 2)
+                    if sentence_bytes >= SENTENCE_DURATION * sample_rate * 2:
+                        schedule(sentence(f"模拟字幕 {sentence_id + 1}", end=True))
+                        sentence_id += 1
+                        sentence_bytes = 0
+                        sentence_start_ms = position_ms
+                    else:
+                        schedule(sentence(f"模拟字幕 {sentence_id + 1} ...", end=False))
+                    continue
+
+                if opcode != 0x1:
+                    continue
+                message = json.loads(payload.decode('utf-8'))
+                action = message['header'].get('action')
+                if action == 'run-task':
+                    self.requests += 1
+                    task_id = message['header'].get('task_id') or uuid.uuid4().hex
+                    parameters = message.get('payload', {}).get('parameters', {})
+                    sample_rate = int(parameters.get('sample_rate') or sample_rate)
+                    if self._should_fail():
+                        schedule(self._dashscope_event(task_id, 'task-failed', error=True))
+                        task_id = None
+                    else:
+                        schedule(self._dashscope_event(task_id, 'task-started', {}))
+                elif action == 'finish-task' and task_id is not None:
+                    if sentence_bytes:
+                        schedule(sentence(f"模拟字幕 {sentence_id + 1}", end=True))
+                    schedule(self._dashscope_event(task_id, 'task-finished', {'output': {}}))
+                    task_id = None
+        finally:
+            await outbox.put(None)
+            try:
+                await asyncio.wait_for(sender, timeout=5)
+            except (asyncio.TimeoutError, ConnectionError):
+                pass
+
+    async def _dashscope_sender(self, writer, outbox):
+        while True:
+            item = await outbox.get()
+            if item is None:
+                return
+            due, message = item
+            delay = due - self.loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            writer.write(encode_websocket_frame(message.encode('utf-8')))
+            await writer.drain()
+
+    def _dashscope_event(self, task_id, event, payload=None, error=False):
+        header = {'task_id': task_id, 'event': event, 'attributes': {}}
+        if error:
+            header['error_code'] = 'InternalError'
+            header['error_message'] = 'Injected failure'
+        return json.dumps({'header': header, 'payload': payload or {}}, ensure_ascii=False)
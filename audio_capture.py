@@ -1,21 +1,68 @@
 import sounddevice as sd
-import numpy as np
 import queue
 import threading
+import time
 from config import Config
+from ring_buffer import AudioRingBuffer
+from chunk_queue import ChunkQueue
+from vad import create_vad, SpeechSegmenter
+from latency import ChunkTrace
+from audio_file import FileInputStream, downmix
+from resampler import Resampler
 
 
 class AudioCapture:
-    """Captures system audio on Windows using WASAPI loopback"""
+    """Captures system audio on Windows using WASAPI loopback
+    
+    The device is opened at its native sample rate and channel count; the
+    audio callback only copies raw interleaved frames into a ring buffer.
+    A processing thread downmixes, resamples to SAMPLE_RATE and cuts chunks.
+    """
     
     def __init__(self, callback=None):
         self.callback = callback
         self.is_recording = False
-        self.audio_queue = queue.Queue()
         self.stream = None
         self.sample_rate = Config.SAMPLE_RATE
         self.chunk_duration = Config.CHUNK_DURATION
-        self.buffer = []
+        self.chunk_size = int(self.sample_rate * self.chunk_duration)
+        # Hop between chunk starts; smaller than chunk_size gives overlapping windows
+        self.hop_size = self.chunk_size
+        if 0 < Config.CHUNK_HOP_DURATION < self.chunk_duration:
+            self.hop_size = int(self.sample_rate * Config.CHUNK_HOP_DURATION)
+        
+        # Bounded chunk queue; the policy decides what happens when transcription falls behind
+        self.audio_queue = ChunkQueue(Config.AUDIO_QUEUE_SIZE, Config.AUDIO_QUEUE_POLICY, self.sample_rate)
+        
+        # Preallocated float32 ring buffer between the audio callback and chunking
+        longest_chunk = self.chunk_duration
+        if Config.ADAPTIVE_CHUNK:
+            longest_chunk = max(longest_chunk, Config.ADAPTIVE_CHUNK_MAX)
+        buffer_capacity = max(
+            int(self.sample_rate * Config.AUDIO_BUFFER_DURATION),
+            int(self.sample_rate * longest_chunk) * 2
+        )
+        self.buffer = AudioRingBuffer(buffer_capacity)
+        self.status_overflows = 0
+        
+        # Raw device frames (interleaved) and the conversion stage, set up per stream
+        self.input_sample_rate = self.sample_rate
+        self.input_channels = 1
+        self.raw_buffer = None
+        self.resampler = None
+        self._processing = False
+        self._process_thread = None
+        self._data_ready = threading.Event()
+        # Serializes conversion between the processing thread and flush()
+        self._process_lock = threading.RLock()
+        self.chunks_emitted = 0
+        # Monotonic time of the latest audio callback (capture timestamp of new chunks)
+        self._callback_time = 0.0
+        
+        # Optional VAD stage: emit variable-length speech segments instead of fixed chunks
+        vad = create_vad()
+        self.segmenter = SpeechSegmenter(vad, self.sample_rate) if vad else None
+        self._update_queue_overlap()
         
     def list_devices(self):
         """List all available audio devices"""
@@ -39,31 +86,163 @@ class AudioCapture:
         print(f"\nUsing default output device for loopback: {default_output['name']}")
         return default_output['index']
     
+    def get_device_format(self, device_index=None):
+        """Native (sample rate, channels) of a device, None for the default input"""
+        if device_index is None:
+            info = sd.query_devices(kind='input')
+        else:
+            info = sd.query_devices(device_index)
+        # A loopback source is an output device, which has no input channels
+        channels = info['max_input_channels'] or info['max_output_channels']
+        return int(info['default_samplerate']), max(1, int(channels))
+    
+    def _open_stream(self, device_index):
+        """Open an input stream in the device's native format"""
+        sample_rate, channels = self.get_device_format(device_index)
+        self._start_processing(sample_rate, channels)
+        return sd.InputStream(
+            device=device_index,
+            channels=channels,
+            samplerate=sample_rate,
+            dtype='float32',
+            callback=self.audio_callback,
+            blocksize=int(sample_rate * 0.1)  # 100ms blocks
+        )
+    
     def audio_callback(self, indata, frames, time_info, status):
-        """Callback for audio stream"""
+        """Callback for audio stream: copy raw frames, nothing else"""
+        self._callback_time = time.monotonic()
         if status:
+            if status.input_overflow:
+                self.status_overflows += 1
             print(f"Audio status: {status}")
         
-        # Convert to mono if stereo
-        if len(indata.shape) > 1:
-            audio_data = np.mean(indata, axis=1)
-        else:
-            audio_data = indata.copy()
+        self.raw_buffer.write(indata.reshape(-1))
+        self._data_ready.set()
+    
+    def _paced_callback(self, indata, frames, time_info, status):
+        """File source without real-time pacing: wait for processing instead of overflowing"""
+        while self._processing and self.raw_buffer.free_space() < indata.size:
+            time.sleep(0.005)
+        self.audio_callback(indata, frames, time_info, status)
+    
+    def _start_processing(self, sample_rate, channels):
+        """Set up the conversion stage for a stream format and start its thread"""
+        self._stop_processing()
+        self.input_sample_rate = int(sample_rate)
+        self.input_channels = int(channels)
+        self.resampler = Resampler(self.input_sample_rate, self.sample_rate)
+        # Whole frames only, so an overflow never splits a frame across channels
+        frames = int(self.input_sample_rate * Config.AUDIO_BUFFER_DURATION)
+        self.raw_buffer = AudioRingBuffer(max(frames, self.input_sample_rate) * self.input_channels)
         
-        self.buffer.extend(audio_data)
+        self.audio_queue.open()
+        self._processing = True
+        self._process_thread = threading.Thread(
+            target=self._process_loop, name='audio-processing', daemon=True
+        )
+        self._process_thread.start()
+    
+    def _stop_processing(self):
+        self._processing = False
+        self._data_ready.set()
+        # Do not leave the thread waiting on a full queue (block policy)
+        self.audio_queue.close()
+        if self._process_thread is not None:
+            if self._process_thread is not threading.current_thread():
+                self._process_thread.join(timeout=2)
+            self._process_thread = None
+    
+    def _process_loop(self):
+        while self._processing:
+            self._data_ready.wait(timeout=0.1)
+            self._data_ready.clear()
+            if not self._processing:
+                break
+            try:
+                self._process_pending()
+            except Exception as e:
+                print(f"Audio processing error: {e}")
+    
+    def _process_pending(self):
+        """Downmix and resample the raw frames received so far, then cut chunks"""
+        # At most one second per pass, so a backlog never overflows the chunk buffer
+        block = self.input_sample_rate * self.input_channels
+        with self._process_lock:
+            while True:
+                available = min(self.raw_buffer.available(), block)
+                available -= available % self.input_channels
+                if available:
+                    frames = self.raw_buffer.read(available).reshape(-1, self.input_channels)
+                    self.buffer.write(self.resampler.process(downmix(frames)))
+                self._drain_buffer()
+                if not available:
+                    break
+    
+    def _drain_buffer(self):
+        """Cut buffered audio into chunks (fixed length or VAD segments)"""
+        if self.segmenter is not None:
+            available = self.buffer.available()
+            if available:
+                for segment in self.segmenter.process(self.buffer.read(available)):
+                    self._emit_chunk(segment)
+            return
         
         # When buffer reaches chunk duration, process it
-        chunk_size = int(self.sample_rate * self.chunk_duration)
-        if len(self.buffer) >= chunk_size:
-            chunk = np.array(self.buffer[:chunk_size], dtype=np.float32)
-            self.buffer = self.buffer[chunk_size:]
-            
-            # Put chunk in queue for processing
-            self.audio_queue.put(chunk)
-            
-            # Call callback if provided
-            if self.callback:
-                self.callback(chunk)
+        while self.buffer.available() >= self.chunk_size:
+            if self.hop_size < self.chunk_size:
+                # Overlapping windows: keep the tail for the next window
+                chunk = self.buffer.peek(self.chunk_size)
+                self.buffer.skip(self.hop_size)
+            else:
+                chunk = self.buffer.read(self.chunk_size)
+            self._emit_chunk(chunk)
+    
+    def _emit_chunk(self, chunk):
+        """Hand a chunk to the transcription queue"""
+        trace = ChunkTrace(self._callback_time)
+        trace.stamp('enqueue')
+        
+        # Put chunk in queue for processing
+        self.audio_queue.put(chunk, trace)
+        self.chunks_emitted += 1
+        
+        # Call callback if provided
+        if self.callback:
+            self.callback(chunk)
+    
+    def set_chunk_duration(self, seconds, hop_seconds=None):
+        """Change the fixed chunk length at runtime (takes effect on the next cut)
+        
+        hop_seconds defaults to the chunk length, i.e. no overlap.
+        """
+        with self._process_lock:
+            self.chunk_duration = seconds
+            self.chunk_size = max(1, int(self.sample_rate * seconds))
+            if hop_seconds is None or hop_seconds >= seconds:
+                self.hop_size = self.chunk_size
+            else:
+                self.hop_size = max(1, int(self.sample_rate * hop_seconds))
+            self._update_queue_overlap()
+    
+    def _update_queue_overlap(self):
+        """Tell the queue how many samples consecutive fixed chunks share"""
+        if self.segmenter is None:
+            self.audio_queue.overlap = self.chunk_size - self.hop_size
+        else:
+            self.audio_queue.overlap = 0
+    
+    def get_buffer_stats(self):
+        """获取音频缓冲区统计信息（含溢出计数）"""
+        stats = self.buffer.get_stats()
+        stats['status_overflows'] = self.status_overflows
+        if self.raw_buffer is not None:
+            stats['input_overflow_count'] = self.raw_buffer.overflow_count
+        stats['chunks_emitted'] = self.chunks_emitted
+        stats.update(self.audio_queue.get_stats())
+        if self.segmenter is not None:
+            stats.update(self.segmenter.get_stats())
+        return stats
     
     def start_capture(self, device_index=None):
         """Start capturing audio"""
@@ -71,6 +250,10 @@ class AudioCapture:
             print("Already recording")
             return
         
+        if Config.AUDIO_SOURCE == 'file':
+            self.start_file_capture(Config.AUDIO_FILE_PATH)
+            return
+        
         try:
             # Get device index
             if device_index is None:
@@ -79,41 +262,87 @@ class AudioCapture:
                     device_index = self.get_loopback_device()
             
             print(f"\nStarting audio capture on device {device_index}")
-            print(f"Sample rate: {self.sample_rate} Hz")
-            print(f"Chunk duration: {self.chunk_duration} seconds")
-            
-            # Create input stream
-            # For Windows WASAPI loopback, we need to use specific hostapi
-            self.stream = sd.InputStream(
-                device=device_index,
-                channels=1,
-                samplerate=self.sample_rate,
-                callback=self.audio_callback,
-                blocksize=int(self.sample_rate * 0.1)  # 100ms blocks
-            )
+            if self.segmenter is not None:
+                print(f"VAD segmentation: {Config.VAD_MODE} "
+                      f"(max segment {Config.VAD_MAX_SEGMENT_DURATION} seconds)")
+            else:
+                print(f"Chunk duration: {self.chunk_duration} seconds")
+                if self.hop_size < self.chunk_size:
+                    print(f"Chunk hop: {self.hop_size / self.sample_rate} seconds (overlapping windows)")
             
+            # Open the device as-is; host-side conversion would add latency
+            # and is a common reason for WASAPI to refuse the stream
+            self.stream = self._open_stream(device_index)
             self.stream.start()
             self.is_recording = True
+            self._print_format()
             print("Audio capture started successfully")
             
         except Exception as e:
+            self._stop_processing()
             print(f"Error starting audio capture: {e}")
-            print("\nTrying alternative method with default input device...")
+            print("\n[WARNING] Falling back to the default input device (usually the microphone); "
+                  "system audio will NOT be captured")
             try:
-                # Fallback to default input device
-                self.stream = sd.InputStream(
-                    channels=1,
-                    samplerate=self.sample_rate,
-                    callback=self.audio_callback,
-                    blocksize=int(self.sample_rate * 0.1)
-                )
+                self.stream = self._open_stream(None)
                 self.stream.start()
                 self.is_recording = True
+                self._print_format()
                 print("Audio capture started with default input device")
             except Exception as e2:
+                self._stop_processing()
                 print(f"Error with fallback method: {e2}")
                 raise
     
+    def _print_format(self):
+        conversion = "" if self.resampler.passthrough else ", resampled"
+        print(f"Device format: {self.input_sample_rate} Hz, {self.input_channels} channel(s) "
+              f"-> {self.sample_rate} Hz mono{conversion}")
+    
+    def start_file_capture(self, path, realtime=None, loop=None):
+        """Replay a WAV file through the same callback/buffer/queue path"""
+        if realtime is None:
+            realtime = Config.AUDIO_FILE_REALTIME
+        if loop is None:
+            loop = Config.AUDIO_FILE_LOOP
+        
+        print(f"\nStarting file audio source: {path}")
+        stream = FileInputStream(
+            path,
+            callback=self.audio_callback if realtime else self._paced_callback,
+            realtime=realtime,
+            loop=loop,
+            finished_callback=self.flush
+        )
+        self._start_processing(stream.samplerate, stream.channels)
+        
+        self._print_format()
+        print(f"Pacing: {'real time' if realtime else 'as fast as possible'}")
+        self.stream = stream
+        self.stream.start()
+        self.is_recording = True
+        print("File audio source started")
+    
+    def flush(self):
+        """Emit audio still buffered at end of input (partial chunk / pending speech)"""
+        with self._process_lock:
+            if self.raw_buffer is not None:
+                self._process_pending()
+                # Samples held back by the resampling filter
+                self.buffer.write(self.resampler.flush())
+            
+            if self.segmenter is not None:
+                self._drain_buffer()
+                segment = self.segmenter.flush()
+                if segment is not None:
+                    self._emit_chunk(segment)
+                return
+            
+            self._drain_buffer()
+            available = self.buffer.available()
+            if available:
+                self._emit_chunk(self.buffer.read(available))
+    
     def stop_capture(self):
         """Stop capturing audio"""
         if not self.is_recording:
@@ -133,24 +362,44 @@ class AudioCapture:
             finally:
                 self.stream = None
         
+        self._stop_processing()
         self.is_recording = False
-        self.buffer = []
+        
+        stats = self.get_buffer_stats()
+        if stats['overflow_count'] or stats['status_overflows'] or stats.get('input_overflow_count'):
+            print(f"Audio buffer overflows: {stats['overflow_count']} "
+                  f"({stats['dropped_samples']} samples dropped), "
+                  f"raw buffer overflows: {stats.get('input_overflow_count', 0)}, "
+                  f"input overflows: {stats['status_overflows']}")
+        if stats['dropped_chunks'] or stats['merged_chunks'] or stats['blocked_seconds']:
+            print(f"Transcription backlog ({stats['queue_policy']}): "
+                  f"max depth {stats['queue_max_depth']}, "
+                  f"{stats['dropped_chunks']} chunks / {stats['dropped_seconds']}s dropped, "
+                  f"{stats['merged_chunks']} merged, {stats['blocked_seconds']}s blocked")
+        if self.segmenter is not None:
+            print(f"VAD stats: {self.segmenter.get_stats()}")
+            self.segmenter.reset()
+        self.buffer.clear()
+        if self.raw_buffer is not None:
+            self.raw_buffer.clear()
         
         # Clear the queue
-        while not self.audio_queue.empty():
-            try:
-                self.audio_queue.get_nowait()
-            except queue.Empty:
-                break
+        self.audio_queue.clear()
         
         print("Audio capture stopped")
     
     def get_audio_chunk(self, timeout=1):
         """Get next audio chunk from queue"""
+        return self.get_traced_chunk(timeout)[0]
+    
+    def get_traced_chunk(self, timeout=1):
+        """Get next audio chunk and its latency trace, (None, None) on timeout"""
         try:
-            return self.audio_queue.get(timeout=timeout)
+            chunk, trace = self.audio_queue.get(timeout=timeout)
         except queue.Empty:
-            return None
+            return None, None
+        trace.stamp('dequeue')
+        return chunk, trace
     
     def __del__(self):
         """Cleanup"""
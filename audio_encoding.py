@@ -0,0 +1,163 @@
+"""
+音频上传编码模块
+将音频块编码为上传给云端识别服务的文件（WAV、FLAC无损、OGG/Opus有损），
+按各服务支持的格式协商编码器，编码器及其缓冲区在音频块之间复用
+FLAC和Opus需要soundfile (pip install soundfile)
+"""
+import io
+import threading
+import wave
+from abc import ABC, abstractmethod
+import numpy as np
+
+UPLOAD_FORMATS = ('wav', 'flac', 'opus')
+
+
+def to_int16(audio: np.ndarray) -> np.ndarray:
+    """Clip float32 samples to [-1, 1] and convert to int16"""
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+class AudioEncoder(ABC):
+    """Encode mono float32 chunks as self-contained audio files
+
+    Every upload is an independent request, so each chunk is a complete file;
+    what carries over between chunks is the encoder object and a per-thread
+    output buffer.
+    """
+
+    name = None
+    extension = None
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether the encoder's dependencies are installed"""
+        return True
+
+    def output_rate(self, sample_rate: int) -> int:
+        """Sample rate of the encoded file for a given input rate"""
+        return sample_rate
+
+    def _buffer(self) -> io.BytesIO:
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = io.BytesIO()
+        buffer.seek(0)
+        buffer.truncate()
+        return buffer
+
+    @abstractmethod
+    def encode(self, audio: np.ndarray, sample_rate: int) -> bytes:
+        """Encode one chunk as a complete file"""
+        pass
+
+
+class WavEncoder(AudioEncoder):
+    """Uncompressed 16-bit PCM WAV"""
+
+    name = 'wav'
+    extension = 'wav'
+
+    def encode(self, audio: np.ndarray, sample_rate: int) -> bytes:
+        buffer = self._buffer()
+        with wave.open(buffer, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(to_int16(audio).tobytes())
+        return buffer.getvalue()
+
+
+class FlacEncoder(AudioEncoder):
+    """Lossless FLAC (about half the size of WAV for speech)"""
+
+    name = 'flac'
+    extension = 'flac'
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import soundfile
+        except (ImportError, OSError):
+            return False
+        return 'FLAC' in soundfile.available_formats()
+
+    def __init__(self):
+        super().__init__()
+        import soundfile
+        self.soundfile = soundfile
+
+    def encode(self, audio: np.ndarray, sample_rate: int) -> bytes:
+        buffer = self._buffer()
+        self.soundfile.write(buffer, to_int16(audio), sample_rate, format='FLAC', subtype='PCM_16')
+        return buffer.getvalue()
+
+
+class OpusEncoder(AudioEncoder):
+    """Lossy Opus in an OGG container (roughly a tenth of WAV for speech)"""
+
+    name = 'opus'
+    extension = 'ogg'
+    # Rates the Opus codec supports; anything else is resampled to 48 kHz
+    RATES = (8000, 12000, 16000, 24000, 48000)
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import soundfile
+        except (ImportError, OSError):
+            return False
+        # Needs libsndfile >= 1.0.29
+        return 'OPUS' in soundfile.available_subtypes('OGG')
+
+    def __init__(self):
+        super().__init__()
+        import soundfile
+        self.soundfile = soundfile
+
+    def output_rate(self, sample_rate: int) -> int:
+        return sample_rate if sample_rate in self.RATES else 48000
+
+    def encode(self, audio: np.ndarray, sample_rate: int) -> bytes:
+        rate = self.output_rate(sample_rate)
+        if rate != sample_rate:
+            from resampler import resample
+            audio = resample(audio, sample_rate, rate)
+        buffer = self._buffer()
+        self.soundfile.write(buffer, np.clip(audio, -1.0, 1.0), rate, format='OGG', subtype='OPUS')
+        return buffer.getvalue()
+
+
+ENCODERS = {
+    'wav': WavEncoder,
+    'flac': FlacEncoder,
+    'opus': OpusEncoder,
+}
+
+
+def negotiate_encoder(supported, preferred: str = 'auto') -> AudioEncoder:
+    """Pick the upload encoder for a service
+
+    ``supported`` lists the formats the provider accepts, best first. 'auto'
+    takes the first one whose dependencies are installed. An explicit format
+    the provider does not accept, or that cannot be encoded here, falls back
+    to the same choice with a warning.
+    """
+    preferred = (preferred or 'auto').lower()
+    if preferred != 'auto':
+        if preferred not in supported:
+            print(f"[WARNING] Upload format '{preferred}' is not supported by this service "
+                  f"(supported: {', '.join(supported)}), negotiating another")
+        elif not ENCODERS[preferred].available():
+            print(f"[WARNING] Upload format '{preferred}' needs soundfile with libsndfile support: "
+                  f"pip install soundfile")
+        else:
+            return ENCODERS[preferred]()
+
+    for name in supported:
+        if ENCODERS[name].available():
+            return ENCODERS[name]()
+    return WavEncoder()
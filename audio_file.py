@@ -0,0 +1,214 @@
+"""
+音频文件读取模块
+读取WAV（内置wave模块）或FLAC等格式（需要soundfile）为float32单声道数据，
+并提供与sounddevice.InputStream接口一致的文件回放音频源
+"""
+import os
+import struct
+import threading
+import time
+import wave
+import numpy as np
+
+AUDIO_FILE_EXTENSIONS = ('.wav', '.flac', '.ogg')
+
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# KSDATAFORMAT_SUBTYPE_* GUIDs share this tail; the first two bytes are the format tag
+SUBFORMAT_GUID_TAIL = b'\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71'
+
+
+def pcm_to_float32(raw: bytes, sample_width: int) -> np.ndarray:
+    """Convert little-endian integer PCM bytes to float32 in [-1, 1]"""
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    if sample_width == 2:
+        return np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+    if sample_width == 3:
+        bytes_ = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        ints = (bytes_[:, 0].astype(np.int32)
+                | (bytes_[:, 1].astype(np.int32) << 8)
+                | (bytes_[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        return ints.astype(np.float32) / 8388608
+    if sample_width == 4:
+        return np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648
+    raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+
+
+def downmix(audio: np.ndarray) -> np.ndarray:
+    """Average interleaved channels (frames x channels) to mono float32"""
+    if audio.ndim == 1 or audio.shape[1] == 1:
+        return np.ascontiguousarray(audio.reshape(-1), dtype=np.float32)
+    return audio.mean(axis=1, dtype=np.float32)
+
+
+def load_audio_file(path: str):
+    """Load an audio file as (mono float32 samples, sample_rate)"""
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == '.wav':
+        try:
+            with wave.open(path, 'rb') as wav_file:
+                channels = wav_file.getnchannels()
+                sample_width = wav_file.getsampwidth()
+                sample_rate = wav_file.getframerate()
+                raw = wav_file.readframes(wav_file.getnframes())
+            audio = pcm_to_float32(raw, sample_width).reshape(-1, channels)
+            return downmix(audio), sample_rate
+        except wave.Error:
+            # e.g. IEEE float WAV, which the wave module cannot read
+            pass
+
+    try:
+        import soundfile
+    except ImportError:
+        raise ImportError(f"读取 {ext} 文件需要安装soundfile: pip install soundfile")
+
+    audio, sample_rate = soundfile.read(path, dtype='float32', always_2d=True)
+    return downmix(audio), sample_rate
+
+
+def find_audio_files(paths):
+    """Expand files and directories into a sorted list of audio files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(AUDIO_FILE_EXTENSIONS):
+                    files.append(os.path.join(path, name))
+        else:
+            files.append(path)
+    return files
+
+
+def open_wav_memmap(path: str):
+    """Memory-map the PCM data of a WAV file
+
+    Returns (frames x channels array, sample_rate). 16/32-bit integer and
+    32-bit float WAV files are mapped without reading them into memory; other
+    formats are loaded with load_audio_file().
+    """
+    with open(path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError(f"Not a WAV file: {path}")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"No data chunk in WAV file: {path}")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt_data = f.read(chunk_size)
+                fmt = struct.unpack('<HHIIHH', fmt_data[:16])
+                f.seek(chunk_size & 1, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                data_offset = f.tell()
+                data_size = chunk_size
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+    if fmt is None:
+        raise ValueError(f"No fmt chunk in WAV file: {path}")
+    format_tag, channels, sample_rate, _, _, bits = fmt
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt_data) >= 40:
+        # The real format is the SubFormat GUID in the extension (usually IEEE float for 32-bit)
+        subformat = fmt_data[24:40]
+        if subformat[2:] == SUBFORMAT_GUID_TAIL:
+            format_tag = struct.unpack('<H', subformat[:2])[0]
+    # Unclassified extensible files fall through to load_audio_file()
+    dtypes = {(1, 16): '<i2', (1, 32): '<i4', (3, 32): '<f4'}
+    dtype = dtypes.get((format_tag, bits))
+    if dtype is None:
+        audio, sample_rate = load_audio_file(path)
+        return audio.reshape(-1, 1), sample_rate
+
+    frame_bytes = channels * bits // 8
+    frames = data_size // frame_bytes
+    data = np.memmap(path, dtype=dtype, mode='r', offset=data_offset, shape=(frames, channels))
+    return data, sample_rate
+
+
+def to_float32(block: np.ndarray) -> np.ndarray:
+    """Convert a block of integer or float samples to float32 in [-1, 1]"""
+    if block.dtype == np.int16:
+        return block.astype(np.float32) / 32768
+    if block.dtype == np.int32:
+        return block.astype(np.float32) / 2147483648
+    return block.astype(np.float32)
+
+
+class FileInputStream:
+    """Replay an audio file through an sd.InputStream-compatible interface
+
+    A background thread reads blocks from the memory-mapped file and calls
+    ``callback(indata, frames, time_info, status)`` exactly like PortAudio
+    does, either paced in real time or as fast as possible.
+    ``finished_callback()`` is called once the file has been fully played.
+    """
+
+    def __init__(self, path: str, callback, blocksize: int = None, realtime: bool = True,
+                 loop: bool = False, finished_callback=None):
+        self.path = path
+        self.data, self.samplerate = open_wav_memmap(path)
+        self.channels = self.data.shape[1]
+        self.callback = callback
+        self.blocksize = blocksize or int(self.samplerate * 0.1)
+        self.realtime = realtime
+        self.loop = loop
+        self.finished_callback = finished_callback
+        self.thread = None
+        self.active = False
+        self.finished = threading.Event()
+
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        self.finished.clear()
+        self.thread = threading.Thread(target=self._run, name='file-audio-source', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        block_duration = self.blocksize / self.samplerate
+        position = 0
+        deadline = time.monotonic()
+        total = len(self.data)
+
+        while self.active:
+            if position >= total:
+                if not self.loop:
+                    break
+                position = 0
+
+            block = to_float32(self.data[position:position + self.blocksize])
+            position += len(block)
+            self.callback(block, len(block), None, None)
+
+            if self.realtime:
+                deadline += block_duration
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+        reached_end = self.active
+        self.active = False
+        # Flush the consumer first, so ``finished`` means everything was delivered
+        if reached_end and self.finished_callback:
+            self.finished_callback()
+        self.finished.set()
+
+    def stop(self):
+        self.active = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+    def abort(self):
+        self.stop()
+
+    def close(self):
+        self.stop()
+        self.data = None
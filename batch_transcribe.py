@@ -0,0 +1,148 @@
+"""
+离线批量转录工具
+将WAV/FLAC文件（或目录下的所有音频文件）转录为SRT/WebVTT字幕，使用与实时模式相同的转录服务
+
+用法:
+  python batch_transcribe.py recording.wav
+  python batch_transcribe.py recordings/ --format vtt --workers 4 --output-dir subs/
+  python batch_transcribe.py meeting.flac --segment vad
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import Config
+from audio_file import load_audio_file, find_audio_files
+from subtitle_writer import SUBTITLE_WRITERS
+from transcription_service import create_transcription_service
+from resampler import resample
+from vad import create_vad, SpeechSegmenter
+
+
+def split_fixed(audio, sample_rate, chunk_duration):
+    """Split audio into fixed-length segments: [(start_seconds, samples)]"""
+    chunk_size = max(1, int(sample_rate * chunk_duration))
+    return [
+        (start / sample_rate, audio[start:start + chunk_size])
+        for start in range(0, len(audio), chunk_size)
+    ]
+
+
+def split_vad(audio, sample_rate, vad_mode):
+    """Split audio into speech segments using VAD: [(start_seconds, samples)]"""
+    vad = create_vad(vad_mode)
+    if vad is None:
+        raise ValueError("VAD segmentation requires a VAD mode other than 'off'")
+    segmenter = SpeechSegmenter(vad, sample_rate)
+    segments = segmenter.process_timed(audio)
+    start, tail = segmenter.flush_timed()
+    if tail is not None:
+        segments.append((start, tail))
+    return [(start / sample_rate, samples) for start, samples in segments]
+
+
+class OrderedSubtitleSink:
+    """Write results to a subtitle file in order as soon as each prefix is complete"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.next_index = 0
+        self.results = {}
+
+    def add(self, index, start, end, text):
+        self.results[index] = (start, end, text)
+        while self.next_index in self.results:
+            start, end, text = self.results.pop(self.next_index)
+            self.writer.write_cue(start, end, text)
+            self.next_index += 1
+
+
+def transcribe_files(files, service, args):
+    """Transcribe all files, sharing one worker pool across their segments"""
+    writer_class = SUBTITLE_WRITERS[args.format]
+    workers = args.workers
+    if workers > 1 and not service.supports_concurrency:
+        print(f"{type(service).__name__} does not support concurrent requests, using 1 worker")
+        workers = 1
+
+    total_audio = 0.0
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch') as executor:
+        for path in files:
+            audio, sample_rate = load_audio_file(path)
+            duration = len(audio) / sample_rate
+            # VAD and services expect SAMPLE_RATE, as in live capture
+            if sample_rate != Config.SAMPLE_RATE:
+                audio = resample(audio, sample_rate, Config.SAMPLE_RATE)
+                sample_rate = Config.SAMPLE_RATE
+            total_audio += duration
+
+            if args.segment == 'vad':
+                segments = split_vad(audio, sample_rate, args.vad_mode)
+            else:
+                segments = split_fixed(audio, sample_rate, args.chunk_duration)
+
+            output_dir = args.output_dir or os.path.dirname(os.path.abspath(path))
+            os.makedirs(output_dir, exist_ok=True)
+            base = os.path.splitext(os.path.basename(path))[0]
+            output_path = os.path.join(output_dir, base + writer_class.extension)
+
+            print(f"{path}: {duration:.1f}s, {len(segments)} segments -> {output_path}")
+            with writer_class(output_path) as writer:
+                sink = OrderedSubtitleSink(writer)
+                futures = {
+                    executor.submit(service.transcribe, samples, sample_rate): index
+                    for index, (_, samples) in enumerate(segments)
+                }
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        text = future.result()
+                    except Exception as e:
+                        print(f"  segment {index} failed: {e}")
+                        text = ""
+                    start, samples = segments[index]
+                    sink.add(index, start, start + len(samples) / sample_rate, text)
+                print(f"  {writer.count} cues written")
+
+    elapsed = time.monotonic() - started
+    if elapsed > 0:
+        print(f"Transcribed {total_audio:.1f}s of audio in {elapsed:.1f}s "
+              f"({total_audio / elapsed:.2f}x real time, {workers} workers)")
+
+
+def main():
+    """Batch transcription entry point"""
+    parser = argparse.ArgumentParser(description="AI实时字幕 - 离线批量转录 (输出SRT/WebVTT)")
+    parser.add_argument('inputs', nargs='+', help="音频文件或目录 (WAV/FLAC)")
+    parser.add_argument('--format', choices=sorted(SUBTITLE_WRITERS), default='srt', help="字幕格式")
+    parser.add_argument('--output-dir', help="输出目录 (默认与音频文件相同)")
+    parser.add_argument('--workers', type=int, default=4, help="并发转录请求数")
+    parser.add_argument('--segment', choices=['fixed', 'vad'], default='fixed',
+                        help="切分方式: 固定时长或按语音停顿")
+    parser.add_argument('--chunk-duration', type=float, default=Config.CHUNK_DURATION,
+                        help="固定切分时长 (秒)")
+    parser.add_argument('--vad-mode', default=Config.VAD_MODE if Config.VAD_MODE != 'off' else 'energy',
+                        help="VAD类型 (--segment vad): energy, webrtc, silero")
+    args = parser.parse_args()
+
+    files = find_audio_files(args.inputs)
+    if not files:
+        print("No audio files found")
+        return 1
+
+    try:
+        Config.validate()
+        service = create_transcription_service()
+        transcribe_files(files, service, args)
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+基准测试工具
+使用本地模拟识别服务器运行完整流水线（文件音频源 → AudioCapture缓冲 → TranscriptionWorker → 字幕接收端），
+报告吞吐量、各阶段延迟分位数、CPU与内存占用，并可与基线结果比较以发现延迟退化
+
+用法:
+  python benchmark.py                                        # OpenAI模拟服务，合成音频
+  python benchmark.py --service aliyun --streaming --latency 150 --jitter 50
+  python benchmark.py --concurrency 4 --fast --json result.json
+  python benchmark.py --baseline baseline.json --max-regression 0.2   # 退化时返回1
+"""
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+
+from config import Config
+from asr_stub_server import StubASRServer
+import latency
+
+
+def synthesize_speech_like(path: str, duration: float, sample_rate: int, seed: int = 0):
+    """Write a mono 16-bit WAV of voiced bursts separated by short pauses"""
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 0.003, int(duration * sample_rate)).astype(np.float32)
+    position = 0.0
+    while position < duration:
+        burst = rng.uniform(1.0, 3.0)
+        start, end = int(position * sample_rate), int(min(position + burst, duration) * sample_rate)
+        t = np.arange(end - start) / sample_rate
+        pitch = rng.uniform(110, 220)
+        # A few harmonics with a syllable-rate envelope
+        voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 5))
+        envelope = 0.5 * (1 - np.cos(2 * np.pi * 4 * t))
+        audio[start:end] += (0.2 * voice * envelope).astype(np.float32)
+        position += burst + rng.uniform(0.3, 0.8)
+
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+
+
+def get_rss_mb():
+    """Resident set size in MB (peak RSS when psutil is not installed), or None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def configure(args, server):
+    """Point the configured service at the stand-in server"""
+    Config.AI_SERVICE = args.service
+    Config.STREAMING_MODE = args.streaming
+    Config.TRANSCRIPTION_CONCURRENCY = args.concurrency
+    Config.CHUNK_DURATION = args.chunk_duration
+    Config.CHUNK_HOP_DURATION = 0
+    Config.ADAPTIVE_CHUNK = args.adaptive_chunk
+    Config.VAD_MODE = args.vad_mode
+    Config.AUDIO_QUEUE_SIZE = args.queue_size
+    Config.AUDIO_QUEUE_POLICY = args.queue_policy
+    Config.AUDIO_UPLOAD_FORMAT = args.upload_format
+    Config.LATENCY_LOG_FILE = ''
+    if args.service == 'openai':
+        Config.OPENAI_API_KEY = 'benchmark'
+        Config.OPENAI_BASE_URL = server.openai_base_url
+    else:
+        import dashscope
+        Config.ALIYUN_API_KEY = 'benchmark'
+        dashscope.base_websocket_api_url = server.dashscope_url
+
+
+def run_benchmark(args):
+    """Run the pipeline once over the audio file and return the result dict"""
+    from audio_capture import AudioCapture
+    from audio_file import open_wav_memmap
+    from transcription_service import create_transcription_service
+    from transcription_worker import TranscriptionWorker
+
+    server = StubASRServer(latency_ms=args.latency, jitter_ms=args.jitter,
+                           error_rate=args.error_rate, seed=args.seed,
+                           connect_ms=args.connect_latency)
+    server.start()
+    configure(args, server)
+
+    data, sample_rate = open_wav_memmap(args.audio)
+    audio_seconds = len(data) / sample_rate
+    del data
+
+    service = create_transcription_service()
+    capture = AudioCapture()
+    worker = TranscriptionWorker(capture, service)
+    tracker = latency.get_tracker()
+    tracker.reset()
+
+    subtitles = []
+    partials = []
+
+    def on_subtitle(text):
+        # Stands in for the window: the subtitle is "painted" on arrival
+        subtitles.append(text)
+        tracker.paint_next()
+
+    worker.add_listener(on_subtitle=on_subtitle, on_partial=partials.append)
+
+    peak_rss = get_rss_mb()
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    worker.start()
+    capture.start_file_capture(args.audio, realtime=not args.fast, loop=False)
+
+    try:
+        # Done when the file is played and every chunk that reached the worker has been recorded
+        drain_deadline = None
+        while True:
+            time.sleep(0.05)
+            peak_rss = max(peak_rss or 0, get_rss_mb() or 0) or None
+            if not capture.stream.finished.is_set():
+                continue
+            queue_stats = capture.audio_queue.get_stats()
+            expected = capture.chunks_emitted - queue_stats['dropped_chunks'] - queue_stats['merged_chunks']
+            if tracker.recorded >= expected:
+                break
+            if drain_deadline is None:
+                drain_deadline = time.monotonic() + args.drain_timeout
+            elif time.monotonic() > drain_deadline:
+                print(f"Timed out waiting for {expected - tracker.recorded} chunks",
+                      file=sys.stderr)
+                break
+    finally:
+        worker.stop()
+        wall_seconds = time.monotonic() - wall_start
+        cpu_seconds = time.process_time() - cpu_start
+        queue_stats = capture.audio_queue.get_stats()
+        capture.stop_capture()
+        server.stop()
+
+    tracker.flush_unpainted()
+    return {
+        'config': {
+            'service': args.service,
+            'latency_ms': args.latency,
+            'jitter_ms': args.jitter,
+            'error_rate': args.error_rate,
+            'connect_latency_ms': args.connect_latency,
+            'concurrency': args.concurrency,
+            'streaming': args.streaming,
+            'realtime': not args.fast,
+            'chunk_duration': args.chunk_duration,
+            'adaptive_chunk': args.adaptive_chunk,
+            'vad_mode': args.vad_mode,
+            'queue_size': args.queue_size,
+            'queue_policy': args.queue_policy,
+            'upload_format': args.upload_format,
+            'audio': os.path.basename(args.audio),
+        },
+        'audio_seconds': round(audio_seconds, 2),
+        'wall_seconds': round(wall_seconds, 2),
+        'realtime_factor': round(audio_seconds / wall_seconds, 3) if wall_seconds > 0 else None,
+        'chunks': capture.chunks_emitted,
+        'subtitles': len(subtitles),
+        'partials': len(partials),
+        'cpu_seconds': round(cpu_seconds, 2),
+        'cpu_percent': round(cpu_seconds / wall_seconds * 100, 1) if wall_seconds > 0 else None,
+        'peak_rss_mb': round(peak_rss, 1) if peak_rss else None,
+        'queue': queue_stats,
+        'adaptive_chunk': worker.chunk_controller.get_stats() if worker.chunk_controller else None,
+        'server': server.get_stats(),
+        'stages': tracker.summary(),
+    }
+
+
+def format_report(result: dict) -> str:
+    """Human readable benchmark report"""
+    lines = [
+        "=== Benchmark ===",
+        f"Config:      {json.dumps(result['config'], ensure_ascii=False)}",
+        f"Audio:       {result['audio_seconds']}s in {result['wall_seconds']}s "
+        f"({result['realtime_factor']}x real time)",
+        f"Chunks:      {result['chunks']}, subtitles: {result['subtitles']}, partials: {result['partials']}",
+        f"CPU:         {result['cpu_seconds']}s ({result['cpu_percent']}%)",
+        f"Peak RSS:    {result['peak_rss_mb']} MB",
+        f"Queue:       {result['queue']}",
+        f"Adaptive:    {result['adaptive_chunk']}",
+        f"Server:      {result['server']}",
+        "",
+        f"{'stage':<22}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}",
+    ]
+    for name, stats in result['stages'].items():
+        lines.append(
+            f"{name:<22}{stats['count']:>7}{stats['p50']:>10}"
+            f"{stats['p95']:>10}{stats['p99']:>10}{stats['max']:>10}"
+        )
+    return "\n".join(lines)
+
+
+def compare_to_baseline(result: dict, baseline: dict, max_regression: float, min_delta_ms: float):
+    """Return a list of regressions (p95 latencies and throughput) against a baseline"""
+    regressions = []
+    for name, stats in result['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if base is None:
+            continue
+        limit = base['p95'] * (1 + max_regression)
+        if stats['p95'] > limit and stats['p95'] - base['p95'] > min_delta_ms:
+            regressions.append(f"{name} p95 {stats['p95']}ms > baseline {base['p95']}ms")
+
+    base_rtf = baseline.get('realtime_factor')
+    rtf = result.get('realtime_factor')
+    if base_rtf and rtf and rtf < base_rtf * (1 - max_regression):
+        regressions.append(f"throughput {rtf}x < baseline {base_rtf}x")
+    return regressions
+
+
+def main():
+    """Benchmark entry point"""
+    parser = argparse.ArgumentParser(description="AI实时字幕 - 流水线基准测试 (本地模拟识别服务)")
+    parser.add_argument('--service', choices=['openai', 'aliyun'], default='openai',
+                        help="模拟的转录服务")
+    parser.add_argument('--audio', help="测试用WAV文件 (任意采样率/声道数，默认合成音频)")
+    parser.add_argument('--duration', type=float, default=20, help="合成音频时长 (秒)")
+    parser.add_argument('--latency', type=float, default=300, help="模拟服务延迟 (毫秒)")
+    parser.add_argument('--jitter', type=float, default=0, help="延迟抖动 ± (毫秒)")
+    parser.add_argument('--connect-latency', type=float, default=0,
+                        help="每个新连接首个请求的额外延迟，模拟DNS/TLS建连 (毫秒)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="请求失败概率 (0-1)")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子 (抖动/错误/合成音频)")
+    parser.add_argument('--concurrency', type=int, default=1, help="并发转录请求数")
+    parser.add_argument('--streaming', action='store_true', help="使用流式模式 (仅aliyun)")
+    parser.add_argument('--chunk-duration', type=float, default=Config.CHUNK_DURATION,
+                        help="音频块时长 (秒)")
+    parser.add_argument('--adaptive-chunk', action='store_true',
+                        help="按往返时间和队列积压自动调整音频块时长 (ADAPTIVE_CHUNK_MIN/MAX)")
+    parser.add_argument('--vad-mode', default='off', help="VAD类型: off, energy, webrtc, silero")
+    parser.add_argument('--queue-size', type=int, default=Config.AUDIO_QUEUE_SIZE,
+                        help="等待转录的音频块上限 (0为不限制)")
+    parser.add_argument('--queue-policy', choices=['block', 'drop_oldest', 'merge', 'skip_to_live'],
+                        default=Config.AUDIO_QUEUE_POLICY, help="转录积压时的处理策略")
+    parser.add_argument('--upload-format', choices=['auto', 'wav', 'flac', 'opus'],
+                        default=Config.AUDIO_UPLOAD_FORMAT, help="上传音频格式 (仅openai)")
+    parser.add_argument('--fast', action='store_true', help="不按实时速度回放，测量最大吞吐量")
+    parser.add_argument('--drain-timeout', type=float, default=30,
+                        help="回放结束后等待剩余结果的最长时间 (秒)")
+    parser.add_argument('--json', help="将结果写入JSON文件")
+    parser.add_argument('--baseline', help="与基线JSON结果比较")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="允许的相对退化幅度 (默认0.2即20%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=5,
+                        help="小于该绝对差值的延迟变化不视为退化 (毫秒)")
+    parser.add_argument('--verbose', action='store_true', help="显示流水线日志")
+    args = parser.parse_args()
+
+    synthetic = None
+    if not args.audio:
+        synthetic = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
+        synthetic.close()
+        synthesize_speech_like(synthetic.name, args.duration, Config.SAMPLE_RATE, args.seed)
+        args.audio = synthetic.name
+
+    try:
+        # Pipeline logs (one line per chunk) would drown the report
+        log_target = contextlib.nullcontext() if args.verbose else open(os.devnull, 'w')
+        with log_target as devnull:
+            with contextlib.redirect_stdout(devnull or sys.stdout):
+                result = run_benchmark(args)
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        if synthetic is not None:
+            os.unlink(synthetic.name)
+
+    if synthetic is not None:
+        result['config']['audio'] = f"synthetic {args.duration}s"
+    print(format_report(result))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != result['config']:
+            print(f"\nWARNING: baseline was recorded with a different configuration: "
+                  f"{json.dumps(baseline.get('config'), ensure_ascii=False)}")
+        regressions = compare_to_baseline(result, baseline, args.max_regression, args.min_delta_ms)
+        if regressions:
+            print("\nREGRESSION:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regression against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+自适应音频块时长模块
+根据实测的转录往返时间和队列积压在运行时调整音频块时长：服务快时缩短音频块以降低延迟，
+跟不上时加长音频块（减少每次请求的固定开销），时长限制在配置的范围内
+"""
+import threading
+from config import Config
+
+# Results at the current duration needed before the next adjustment
+MIN_SAMPLES = 2
+# Smoothing factor of the load average
+EWMA_ALPHA = 0.3
+# Shrink only when the load is below this fraction of the target (hysteresis)
+SHRINK_MARGIN = 0.7
+GROW_FACTOR = 1.25
+MAX_GROW_FACTOR = 2.0
+SHRINK_FACTOR = 0.9
+
+
+class AdaptiveChunkController:
+    """Tune the chunk duration from round-trip time and queue depth
+
+    The load of a chunk is its round-trip time divided by the new audio it
+    covers (the hop, for overlapping windows) times the number of concurrent
+    requests, i.e. the fraction of real time the service needs to keep up.
+    A load above ``target_load`` or a backlog in the queue lengthens the
+    chunks (fewer requests, each fixed overhead paid less often); a load
+    well below the target with an empty queue shortens them, since a
+    chunk's own duration is the largest part of its latency. Durations are
+    multiples of 0.1 s within [min_duration, max_duration].
+    """
+
+    def __init__(self, duration: float, min_duration: float = None, max_duration: float = None,
+                 target_load: float = None, concurrency: int = 1):
+        self.min_duration = Config.ADAPTIVE_CHUNK_MIN if min_duration is None else min_duration
+        self.max_duration = Config.ADAPTIVE_CHUNK_MAX if max_duration is None else max_duration
+        self.target_load = Config.ADAPTIVE_CHUNK_TARGET_LOAD if target_load is None else target_load
+        self.concurrency = max(1, concurrency)
+        self.duration = self._clamp(duration)
+
+        self.load = None      # smoothed load, kept for reporting
+        self._load = None     # smoothed load at the current duration
+        self._samples = 0
+        self._lock = threading.Lock()
+        self.adjustments = 0
+
+    def _clamp(self, duration: float) -> float:
+        return round(min(self.max_duration, max(self.min_duration, duration)), 1)
+
+    def record(self, audio_seconds: float, rtt: float, queue_depth: int = 0,
+               hop_seconds: float = None):
+        """Feed one transcription result; returns the new duration if it changed, else None
+
+        ``hop_seconds`` is the current hop between overlapping windows (None
+        when they do not overlap); ``queue_depth`` counts chunks waiting for
+        a request slot.
+        """
+        with self._lock:
+            # Chunks cut before the last change (still queued) would repeat the
+            # old verdict; merged chunks are longer and still count
+            if audio_seconds < self.duration - 0.05:
+                return None
+            # A request is sent per hop; merged chunks cover several hops
+            overlap = self.duration - hop_seconds if hop_seconds else 0.0
+            new_audio = max(audio_seconds - overlap, 0.1)
+            load = rtt / (new_audio * self.concurrency)
+            self._load = load if self._load is None else EWMA_ALPHA * load + (1 - EWMA_ALPHA) * self._load
+            self.load = self._load
+            self._samples += 1
+            if self._samples < MIN_SAMPLES:
+                return None
+
+            backlog = queue_depth > 0
+            if backlog or self._load > self.target_load:
+                # With a fixed per-request overhead, load scales with 1/duration
+                factor = min(MAX_GROW_FACTOR, max(GROW_FACTOR, self._load / self.target_load))
+                duration = self._clamp(max(self.duration * factor, self.duration + 0.1))
+            elif self._load < self.target_load * SHRINK_MARGIN:
+                duration = self._clamp(min(self.duration * SHRINK_FACTOR, self.duration - 0.1))
+            else:
+                return None
+            if duration == self.duration:
+                return None
+
+            self.duration = duration
+            # Judge the new duration on its own results
+            self._samples = 0
+            self._load = None
+            self.adjustments += 1
+            return duration
+
+    def get_stats(self):
+        """获取自适应音频块统计信息"""
+        with self._lock:
+            return {
+                'chunk_duration': self.duration,
+                'chunk_load': round(self.load, 3) if self.load is not None else None,
+                'chunk_adjustments': self.adjustments,
+            }
@@ -0,0 +1,152 @@
+"""
+有界音频块队列模块
+在音频处理线程与转录线程之间传递音频块；转录跟不上时按配置的策略处理积压
+（阻塞、丢弃最旧、合并相邻块、跳到最新），并统计队列深度与丢弃的音频时长
+"""
+import collections
+import queue
+import threading
+import time
+import numpy as np
+
+POLICIES = ('block', 'drop_oldest', 'merge', 'skip_to_live')
+
+# Longest chunk 'merge' builds (services and Whisper's window handle ~30 s)
+MAX_MERGED_SECONDS = 30
+
+
+class ChunkQueue:
+    """Bounded FIFO of (chunk, trace) pairs with a backpressure policy
+
+    When ``maxsize`` chunks are queued, put() applies the policy:
+
+    - block: wait for the consumer (no audio lost; capture falls behind)
+    - drop_oldest: discard the oldest chunk
+    - merge: join the two oldest chunks into one request, keeping the
+      older trace (falls back to drop_oldest past MAX_MERGED_SECONDS)
+    - skip_to_live: discard the whole backlog and keep only the new chunk
+
+    ``overlap`` is the number of leading samples a chunk repeats from the
+    previous one (overlapping windows); merge drops them when joining.
+    get() / get_nowait() / empty() behave like queue.Queue.
+    """
+
+    def __init__(self, maxsize: int = 10, policy: str = 'merge', sample_rate: int = 16000):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy} (expected one of {', '.join(POLICIES)})")
+        self.maxsize = max(0, int(maxsize))  # 0 = unbounded
+        self.policy = policy
+        self.sample_rate = sample_rate
+        self.overlap = 0
+
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+
+        self.max_depth = 0
+        self.dropped_chunks = 0
+        self.dropped_samples = 0
+        self.merged_chunks = 0
+        self.blocked_seconds = 0.0
+
+    def qsize(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def _full(self) -> bool:
+        return self.maxsize > 0 and len(self._items) >= self.maxsize
+
+    def put(self, chunk: np.ndarray, trace=None) -> bool:
+        """Queue a chunk, applying the policy when full. False if it was dropped"""
+        with self._lock:
+            if self._full():
+                if self.policy == 'block':
+                    started = time.monotonic()
+                    while self._full() and not self._closed:
+                        self._not_full.wait(0.1)
+                    self.blocked_seconds += time.monotonic() - started
+                    if self._closed:
+                        return False
+                elif self.policy == 'skip_to_live':
+                    while self._items:
+                        self._drop_oldest()
+                elif self.policy == 'merge' and self._merge_oldest():
+                    pass
+                else:
+                    self._drop_oldest()
+
+            self._items.append((chunk, trace))
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._not_empty.notify()
+            return True
+
+    def _drop_oldest(self):
+        chunk, _ = self._items.popleft()
+        self.dropped_chunks += 1
+        # Overlapping samples are still present in the chunk that follows
+        self.dropped_samples += max(0, len(chunk) - self.overlap)
+
+    def _merge_oldest(self) -> bool:
+        """Join the two oldest chunks, False if the result would be too long"""
+        if len(self._items) < 2:
+            return False
+        (first, trace), (second, _) = self._items[0], self._items[1]
+        second = second[min(self.overlap, len(second)):]
+        if len(first) + len(second) > MAX_MERGED_SECONDS * self.sample_rate:
+            return False
+        self._items.popleft()
+        self._items[0] = (np.concatenate((first, second)), trace)
+        self.merged_chunks += 1
+        return True
+
+    def get(self, block: bool = True, timeout: float = None):
+        """Remove and return the oldest (chunk, trace); raise queue.Empty on timeout"""
+        with self._lock:
+            if not block:
+                if not self._items:
+                    raise queue.Empty
+            elif not self._not_empty.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            item = self._items.popleft()
+            self._not_full.notify()
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def clear(self):
+        """Drop everything queued (not counted as dropped audio)"""
+        with self._lock:
+            self._items.clear()
+            self._not_full.notify_all()
+
+    def close(self):
+        """Make blocking puts give up (dropping their chunk) until open()"""
+        with self._lock:
+            self._closed = True
+            self._not_full.notify_all()
+
+    def open(self):
+        with self._lock:
+            self._closed = False
+
+    def get_stats(self):
+        """获取队列统计信息"""
+        with self._lock:
+            depth = len(self._items)
+            queued_samples = sum(len(chunk) for chunk, _ in self._items)
+        return {
+            'queue_policy': self.policy,
+            'queue_depth': depth,
+            'queue_seconds': round(queued_samples / self.sample_rate, 2),
+            'queue_max_depth': self.max_depth,
+            'dropped_chunks': self.dropped_chunks,
+            'dropped_seconds': round(self.dropped_samples / self.sample_rate, 2),
+            'merged_chunks': self.merged_chunks,
+            'blocked_seconds': round(self.blocked_seconds, 2),
+        }
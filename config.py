@@ -14,6 +14,17 @@ class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'whisper-1')
     OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+    # HTTP connection pool shared by all OpenAI requests
+    OPENAI_POOL_SIZE = int(os.getenv('OPENAI_POOL_SIZE', 8))
+    OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 60))  # idle seconds before a connection is closed
+    OPENAI_HTTP2 = os.getenv('OPENAI_HTTP2', 'false').lower() == 'true'  # requires: pip install httpx[http2]
+    OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 30))  # seconds
+    OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', 5))  # seconds
+    # SDK retries per request, timeouts included; -1 = 0 with FALLBACK_SERVICES/HEDGE_SERVICE
+    # (the circuit breaker decides on failover), else the SDK default of 2
+    OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', -1))
+    # Keep a connection alive with a cheap request after this many idle seconds; 0 disables
+    OPENAI_KEEPALIVE_INTERVAL = float(os.getenv('OPENAI_KEEPALIVE_INTERVAL', 20))
     
     # Azure Speech Configuration
     AZURE_SPEECH_KEY = os.getenv('AZURE_SPEECH_KEY', '')
@@ -24,10 +35,88 @@ class Config:
     # 支持的模型: paraformer-realtime-v2, fun-asr-realtime-2025-11-07
     ALIYUN_MODEL = os.getenv('ALIYUN_MODEL', 'paraformer-realtime-v2')
     
+    # faster-whisper (CTranslate2) local model Configuration
+    # 模型: tiny, base, small, medium, large-v3 或本地CTranslate2模型目录
+    FASTER_WHISPER_MODEL = os.getenv('FASTER_WHISPER_MODEL', 'small')
+    FASTER_WHISPER_DEVICE = os.getenv('FASTER_WHISPER_DEVICE', 'cpu')
+    # int8, int8_float16, float16, float32
+    FASTER_WHISPER_COMPUTE_TYPE = os.getenv('FASTER_WHISPER_COMPUTE_TYPE', 'int8')
+    FASTER_WHISPER_CPU_THREADS = int(os.getenv('FASTER_WHISPER_CPU_THREADS', 0))  # 0 = all cores
+    FASTER_WHISPER_BEAM_SIZE = int(os.getenv('FASTER_WHISPER_BEAM_SIZE', 1))  # 1 = greedy decoding
+    
+    # Hedged requests: also send slow chunks to this service (any AI_SERVICE value; empty disables)
+    HEDGE_SERVICE = os.getenv('HEDGE_SERVICE', '')
+    # Seconds to wait for AI_SERVICE before hedging; 0 = its rolling HEDGE_PERCENTILE latency
+    HEDGE_DELAY = float(os.getenv('HEDGE_DELAY', 0))
+    HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', 0.9))
+    
+    # Failover: comma-separated services tried after AI_SERVICE, e.g. openai,local_whisper
+    FALLBACK_SERVICES = os.getenv('FALLBACK_SERVICES', '')
+    # Circuit breaker: open when BREAKER_ERROR_RATE of the last BREAKER_WINDOW calls failed,
+    # or at once on a failure slower than BREAKER_SLOW_SECONDS; probe again after BREAKER_OPEN_SECONDS
+    BREAKER_ERROR_RATE = float(os.getenv('BREAKER_ERROR_RATE', 0.5))
+    BREAKER_WINDOW = int(os.getenv('BREAKER_WINDOW', 10))
+    BREAKER_SLOW_SECONDS = float(os.getenv('BREAKER_SLOW_SECONDS', 10))
+    BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', 30))
+    
+    # Audio upload format for cloud services: auto, wav, flac (lossless), opus (lossy)
+    AUDIO_UPLOAD_FORMAT = os.getenv('AUDIO_UPLOAD_FORMAT', 'auto').lower()
+    
+    # Run local models (local_whisper / faster_whisper) in separate processes; 0 = in-process
+    LOCAL_INFERENCE_PROCESSES = int(os.getenv('LOCAL_INFERENCE_PROCESSES', 0))
+    
     # Audio Settings
     SAMPLE_RATE = int(os.getenv('SAMPLE_RATE', 16000))
-    CHUNK_DURATION = int(os.getenv('CHUNK_DURATION', 3))  # seconds
+    CHUNK_DURATION = float(os.getenv('CHUNK_DURATION', 3))  # seconds
+    # Hop between overlapping chunks; 0 or >= CHUNK_DURATION disables overlap
+    CHUNK_HOP_DURATION = float(os.getenv('CHUNK_HOP_DURATION', 0))  # seconds
+    # Tune CHUNK_DURATION at runtime from round-trip time and queue depth, within MIN..MAX seconds
+    ADAPTIVE_CHUNK = os.getenv('ADAPTIVE_CHUNK', 'false').lower() == 'true'
+    ADAPTIVE_CHUNK_MIN = float(os.getenv('ADAPTIVE_CHUNK_MIN', 1.0))  # seconds
+    ADAPTIVE_CHUNK_MAX = float(os.getenv('ADAPTIVE_CHUNK_MAX', 8.0))  # seconds
+    # Fraction of real time the service may spend transcribing before chunks get longer
+    ADAPTIVE_CHUNK_TARGET_LOAD = float(os.getenv('ADAPTIVE_CHUNK_TARGET_LOAD', 0.7))
     AUDIO_DEVICE_INDEX = int(os.getenv('AUDIO_DEVICE_INDEX', -1))
+    # Audio source: device (live capture) or file (replay a WAV file)
+    AUDIO_SOURCE = os.getenv('AUDIO_SOURCE', 'device').lower()
+    AUDIO_FILE_PATH = os.getenv('AUDIO_FILE_PATH', '')
+    AUDIO_FILE_REALTIME = os.getenv('AUDIO_FILE_REALTIME', 'true').lower() == 'true'
+    AUDIO_FILE_LOOP = os.getenv('AUDIO_FILE_LOOP', 'false').lower() == 'true'
+    AUDIO_BUFFER_DURATION = float(os.getenv('AUDIO_BUFFER_DURATION', 10))  # ring buffer capacity, seconds
+    # Chunks waiting for transcription (0 = unbounded) and what to do when full:
+    # block, drop_oldest, merge (join adjacent chunks) or skip_to_live
+    AUDIO_QUEUE_SIZE = int(os.getenv('AUDIO_QUEUE_SIZE', 10))
+    AUDIO_QUEUE_POLICY = os.getenv('AUDIO_QUEUE_POLICY', 'merge').lower()
+    
+    # Streaming mode: keep one recognition session open (services that support it)
+    STREAMING_MODE = os.getenv('STREAMING_MODE', 'false').lower() == 'true'
+    STREAM_CHUNK_DURATION = float(os.getenv('STREAM_CHUNK_DURATION', 0.1))  # seconds per pushed frame
+    # Local Whisper streaming: re-decode interval and max buffered audio before a forced cut
+    LOCAL_STREAM_INTERVAL = float(os.getenv('LOCAL_STREAM_INTERVAL', 1.0))  # seconds
+    LOCAL_STREAM_MAX_BUFFER = float(os.getenv('LOCAL_STREAM_MAX_BUFFER', 15))  # seconds
+    
+    # Concurrent transcription requests (results are emitted in capture order)
+    TRANSCRIPTION_CONCURRENCY = int(os.getenv('TRANSCRIPTION_CONCURRENCY', 1))
+    REORDER_WINDOW = int(os.getenv('REORDER_WINDOW', 8))  # max chunks in flight or awaiting emit
+    STRAGGLER_TIMEOUT = float(os.getenv('STRAGGLER_TIMEOUT', 15))  # seconds before a chunk is skipped
+    
+    # Latency statistics (JSON summary written when capture stops; empty disables)
+    LATENCY_LOG_FILE = os.getenv('LATENCY_LOG_FILE', '')
+    
+    # Subtitle fan-out server (WebSocket / SSE / HTML overlay)
+    SUBTITLE_SERVER_ENABLED = os.getenv('SUBTITLE_SERVER_ENABLED', 'false').lower() == 'true'
+    SUBTITLE_SERVER_HOST = os.getenv('SUBTITLE_SERVER_HOST', '127.0.0.1')
+    SUBTITLE_SERVER_PORT = int(os.getenv('SUBTITLE_SERVER_PORT', 8765))
+    
+    # Voice Activity Detection (off, energy, webrtc, silero)
+    VAD_MODE = os.getenv('VAD_MODE', 'off')
+    VAD_MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', 250))
+    VAD_MAX_SEGMENT_DURATION = float(os.getenv('VAD_MAX_SEGMENT_DURATION', 8))  # seconds
+    VAD_HANGOVER_MS = int(os.getenv('VAD_HANGOVER_MS', 500))
+    VAD_PREROLL_MS = int(os.getenv('VAD_PREROLL_MS', 200))
+    VAD_ENERGY_RATIO = float(os.getenv('VAD_ENERGY_RATIO', 3.0))
+    VAD_WEBRTC_AGGRESSIVENESS = int(os.getenv('VAD_WEBRTC_AGGRESSIVENESS', 2))
+    VAD_SILERO_THRESHOLD = float(os.getenv('VAD_SILERO_THRESHOLD', 0.5))
     
     # UI Settings
     WINDOW_WIDTH = int(os.getenv('WINDOW_WIDTH', 800))
@@ -44,4 +133,6 @@ class Config:
             raise ValueError("AZURE_SPEECH_KEY and AZURE_SPEECH_REGION are required when using Azure service")
         if cls.AI_SERVICE == 'aliyun' and not cls.ALIYUN_API_KEY:
             raise ValueError("ALIYUN_API_KEY is required when using Aliyun service")
+        if cls.AUDIO_SOURCE == 'file' and not cls.AUDIO_FILE_PATH:
+            raise ValueError("AUDIO_FILE_PATH is required when AUDIO_SOURCE is file")
         return True
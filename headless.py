@@ -0,0 +1,198 @@
+"""
+无界面运行模式
+不依赖PyQt5，复用音频捕获与转录流程，将字幕以JSON行输出到标准输出、文件或TCP套接字
+
+用法:
+  python headless.py                                   # 输出到标准输出
+  python headless.py --output file --path subs.jsonl   # 追加写入文件
+  python headless.py --output socket --host 127.0.0.1 --port 9000
+"""
+import sys
+import json
+import time
+import socket
+import signal
+import argparse
+import threading
+
+from config import Config
+from audio_capture import AudioCapture
+from transcription_service import create_transcription_service
+from transcription_worker import TranscriptionWorker
+from subtitle_server import SubtitleServer
+import latency
+
+
+class JsonLinesSink:
+    """Write subtitle events as JSON lines to a text stream"""
+
+    def __init__(self, stream, close_stream=False):
+        self.stream = stream
+        self.close_stream = close_stream
+        self._lock = threading.Lock()
+
+    def write(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def close(self):
+        if self.close_stream:
+            self.stream.close()
+
+
+class SocketSink:
+    """Send subtitle events as JSON lines over TCP, reconnecting on failure"""
+
+    def __init__(self, host: str, port: int):
+        self.address = (host, port)
+        self.sock = None
+        self._lock = threading.Lock()
+
+    def write(self, event: dict):
+        data = (json.dumps(event, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock:
+            for _ in range(2):
+                try:
+                    if self.sock is None:
+                        self.sock = socket.create_connection(self.address, timeout=5)
+                    self.sock.sendall(data)
+                    return
+                except OSError as e:
+                    print(f"Socket output error: {e}", file=sys.stderr)
+                    self._close_socket()
+
+    def _close_socket(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def close(self):
+        with self._lock:
+            self._close_socket()
+
+
+def create_sink(args):
+    """Create the output sink selected on the command line"""
+    if args.output == 'stdout':
+        stream = sys.stdout
+        # Keep stdout clean for JSON lines; diagnostics go to stderr
+        sys.stdout = sys.stderr
+        return JsonLinesSink(stream)
+    if args.output == 'file':
+        if not args.path:
+            raise ValueError("--path is required for file output")
+        return JsonLinesSink(open(args.path, 'a', encoding='utf-8'), close_stream=True)
+    if args.output == 'socket':
+        return SocketSink(args.host, args.port)
+    raise ValueError(f"Unknown output: {args.output}")
+
+
+class HeadlessSubtitleApp:
+    """Capture + transcription pipeline without any UI"""
+
+    def __init__(self, sink, include_partial=False, device_index=None, serve=False):
+        self.sink = sink
+        self.include_partial = include_partial
+        self.device_index = device_index
+        self.serve = serve
+        self.audio_capture = None
+        self.transcription_worker = None
+        self.subtitle_server = None
+        self._stop_event = threading.Event()
+
+    def initialize(self):
+        """Initialize services"""
+        Config.validate()
+        self.audio_capture = AudioCapture()
+        transcription_service = create_transcription_service()
+        self.transcription_worker = TranscriptionWorker(self.audio_capture, transcription_service)
+        self.transcription_worker.add_listener(
+            on_subtitle=self.on_subtitle,
+            on_partial=self.on_partial if self.include_partial else None
+        )
+        if self.serve:
+            self.subtitle_server = SubtitleServer()
+            self.subtitle_server.start()
+            self.transcription_worker.add_listener(
+                on_subtitle=self.subtitle_server.publish_final,
+                on_partial=self.subtitle_server.publish_partial
+            )
+
+    def on_subtitle(self, text):
+        self.sink.write({'type': 'final', 'text': text, 'timestamp': time.time()})
+        # Output written is the headless equivalent of the label being painted
+        latency.get_tracker().paint_next()
+
+    def on_partial(self, text):
+        self.sink.write({'type': 'partial', 'text': text, 'timestamp': time.time()})
+
+    def run(self, duration=None):
+        """Run until stopped (signal, Ctrl+C) or for ``duration`` seconds"""
+        try:
+            self.initialize()
+            self.audio_capture.start_capture(self.device_index)
+            self.transcription_worker.start()
+            self._stop_event.wait(timeout=duration)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def request_stop(self, *args):
+        self._stop_event.set()
+
+    def stop(self):
+        if self.transcription_worker:
+            self.transcription_worker.stop()
+        if self.audio_capture:
+            self.audio_capture.stop_capture()
+        if self.subtitle_server:
+            self.subtitle_server.stop()
+        self.sink.close()
+
+
+def main():
+    """Headless entry point"""
+    parser = argparse.ArgumentParser(description="AI实时字幕 - 无界面模式")
+    parser.add_argument('--output', choices=['stdout', 'file', 'socket'], default='stdout',
+                        help="字幕输出方式 (默认: stdout)")
+    parser.add_argument('--path', help="输出文件路径 (--output file)")
+    parser.add_argument('--host', default='127.0.0.1', help="TCP目标地址 (--output socket)")
+    parser.add_argument('--port', type=int, default=9000, help="TCP目标端口 (--output socket)")
+    parser.add_argument('--partial', action='store_true', help="同时输出流式中间结果")
+    parser.add_argument('--device', type=int, default=None, help="音频设备索引 (默认使用配置)")
+    parser.add_argument('--serve', action='store_true',
+                        help="启动字幕分发服务器 (WebSocket/SSE，地址见SUBTITLE_SERVER_*配置)")
+    parser.add_argument('--duration', type=float, default=None, help="运行指定秒数后退出")
+    args = parser.parse_args()
+
+    try:
+        sink = create_sink(args)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    app = HeadlessSubtitleApp(
+        sink,
+        include_partial=args.partial,
+        device_index=args.device,
+        serve=args.serve or Config.SUBTITLE_SERVER_ENABLED
+    )
+    signal.signal(signal.SIGINT, app.request_stop)
+    signal.signal(signal.SIGTERM, app.request_stop)
+
+    try:
+        app.run(args.duration)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
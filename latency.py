@@ -0,0 +1,170 @@
+"""
+延迟统计模块
+记录每个音频块在各处理阶段的时间戳，统计“语音到屏幕”的端到端延迟分布
+"""
+import collections
+import json
+import threading
+import time
+import numpy as np
+
+# Pipeline stages in order; a chunk may skip stages that do not apply to it
+STAGES = (
+    'callback',   # audio callback delivered the samples that completed the chunk
+    'enqueue',    # chunk put on the capture queue
+    'dequeue',    # worker took the chunk off the queue
+    'encode',     # audio encoded for upload (WAV/PCM)
+    'send',       # request sent to the service / local decode started
+    'response',   # response received / local decode finished
+    'emit',       # subtitle signal emitted by the worker
+    'paint',      # subtitle label updated in the window
+)
+
+
+class ChunkTrace:
+    """Monotonic timestamps of one audio chunk as it moves through the pipeline"""
+
+    __slots__ = ('capture_time', 'stamps')
+
+    def __init__(self, capture_time: float = None):
+        self.capture_time = time.monotonic() if capture_time is None else capture_time
+        self.stamps = {'callback': self.capture_time}
+
+    def stamp(self, stage: str):
+        """Record the current time for a stage"""
+        self.stamps[stage] = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling latency histograms per stage (thread-safe)
+
+    Two kinds of series are kept, both in milliseconds:
+    - ``<stage>``: time from capture to that stage (cumulative)
+    - ``<prev>-><stage>``: time spent between consecutive recorded stages
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._series = {}
+        self._lock = threading.Lock()
+        # Traces emitted by the worker and waiting for the window to paint them
+        self._awaiting_paint = collections.deque()
+        self.recorded = 0
+
+    def record(self, trace: ChunkTrace):
+        """Add a finished trace to the histograms"""
+        present = [stage for stage in STAGES if stage in trace.stamps]
+        with self._lock:
+            previous = None
+            for stage in present:
+                stamp = trace.stamps[stage]
+                if stage != 'callback':
+                    self._append(stage, (stamp - trace.capture_time) * 1000)
+                if previous is not None:
+                    self._append(f"{previous}->{stage}", (stamp - trace.stamps[previous]) * 1000)
+                previous = stage
+            self.recorded += 1
+
+    def _append(self, name: str, value: float):
+        series = self._series.get(name)
+        if series is None:
+            series = self._series[name] = collections.deque(maxlen=self.window)
+        series.append(value)
+
+    def mark_emitted(self, trace: ChunkTrace):
+        """Queue a trace whose text was emitted; recorded when painted"""
+        self._awaiting_paint.append(trace)
+
+    def paint_next(self):
+        """Stamp and record the oldest emitted trace (called by the UI thread)"""
+        try:
+            trace = self._awaiting_paint.popleft()
+        except IndexError:
+            return
+        trace.stamp('paint')
+        self.record(trace)
+
+    def flush_unpainted(self):
+        """Record emitted traces that were never painted (e.g. headless or on stop)"""
+        while True:
+            try:
+                trace = self._awaiting_paint.popleft()
+            except IndexError:
+                return
+            self.record(trace)
+
+    def summary(self) -> dict:
+        """Return {series: {count, p50, p95, p99, max}} in milliseconds"""
+        with self._lock:
+            snapshot = {name: np.array(values) for name, values in self._series.items() if values}
+
+        def order(name):
+            last = name.split('->')[-1]
+            return (STAGES.index(last), '->' in name)
+
+        result = {}
+        for name in sorted(snapshot, key=order):
+            values = snapshot[name]
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result[name] = {
+                'count': int(len(values)),
+                'p50': round(float(p50), 1),
+                'p95': round(float(p95), 1),
+                'p99': round(float(p99), 1),
+                'max': round(float(values.max()), 1),
+            }
+        return result
+
+    def format_summary(self) -> str:
+        """Human readable summary table"""
+        lines = [f"{'stage':<22}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"]
+        for name, stats in self.summary().items():
+            lines.append(
+                f"{name:<22}{stats['count']:>7}{stats['p50']:>10}"
+                f"{stats['p95']:>10}{stats['p99']:>10}{stats['max']:>10}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: str):
+        """Write the summary as JSON"""
+        data = {
+            'timestamp': time.time(),
+            'recorded_chunks': self.recorded,
+            'unit': 'ms',
+            'stages': self.summary(),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def reset(self):
+        """Clear all collected samples"""
+        with self._lock:
+            self._series.clear()
+            self._awaiting_paint.clear()
+            self.recorded = 0
+
+
+_tracker = LatencyTracker()
+_current = threading.local()
+
+
+def get_tracker() -> LatencyTracker:
+    """Process-wide latency tracker"""
+    return _tracker
+
+
+def set_current_trace(trace):
+    """Bind a trace to the calling thread so services can stamp it"""
+    _current.trace = trace
+
+
+def get_current_trace():
+    """Trace bound to the calling thread, or None"""
+    return getattr(_current, 'trace', None)
+
+
+def stamp(stage: str):
+    """Stamp the trace bound to the calling thread (no-op if none)"""
+    trace = getattr(_current, 'trace', None)
+    if trace is not None:
+        trace.stamp(stage)
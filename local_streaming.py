@@ -0,0 +1,218 @@
+"""
+本地Whisper流式识别模块
+以较短间隔重复解码不断增长的音频缓冲区，只提交连续两次假设中一致的前缀（LocalAgreement），
+在已提交的句子边界处裁剪缓冲区，并输出中间结果与最终结果
+"""
+import re
+import threading
+import time
+import numpy as np
+
+# Words ending a sentence (Chinese and Western punctuation)
+SENTENCE_END = re.compile(r'[。！？!?.…]["”’」』)]*$')
+
+
+class Word:
+    """A decoded word with absolute start/end times in seconds"""
+
+    __slots__ = ('start', 'end', 'text')
+
+    def __init__(self, start: float, end: float, text: str):
+        self.start = start
+        self.end = end
+        self.text = text
+
+    @property
+    def key(self) -> str:
+        """Normalized text used to compare hypotheses"""
+        return self.text.strip().lower()
+
+
+def join_words(words) -> str:
+    """Join word texts; Whisper words carry their own leading spaces"""
+    return "".join(word.text for word in words).strip()
+
+
+class LocalAgreement:
+    """Commit the prefix two consecutive hypotheses agree on (LocalAgreement-2)"""
+
+    def __init__(self, max_ngram: int = 5):
+        self.max_ngram = max_ngram
+        self.committed_end = 0.0
+        self.recent = []      # last committed words, to drop re-decoded duplicates
+        self.pending = []     # previous hypothesis after the committed part
+
+    def insert(self, words) -> list:
+        """Feed a new hypothesis (absolute times), return newly committed words"""
+        # Only words after what is already committed (small tolerance for timing drift)
+        words = [word for word in words if word.start >= self.committed_end - 0.1]
+        words = self._drop_overlap(words)
+
+        committed = []
+        for old, new in zip(self.pending, words):
+            if old.key != new.key:
+                break
+            committed.append(new)
+
+        self.pending = words[len(committed):]
+        if committed:
+            self.committed_end = committed[-1].end
+            self.recent = (self.recent + committed)[-self.max_ngram:]
+        return committed
+
+    def _drop_overlap(self, words):
+        """Remove leading words that repeat the tail of the committed text"""
+        if not words or not self.recent:
+            return words
+        for n in range(min(len(self.recent), len(words), self.max_ngram), 0, -1):
+            tail = [word.key for word in self.recent[-n:]]
+            head = [word.key for word in words[:n]]
+            if tail == head:
+                return words[n:]
+        return words
+
+    def flush(self) -> list:
+        """Commit the pending hypothesis as-is (end of stream)"""
+        committed, self.pending = self.pending, []
+        if committed:
+            self.committed_end = committed[-1].end
+        return committed
+
+    def trim(self, time_offset: float):
+        """Forget pending words that start before a buffer cut"""
+        self.pending = [word for word in self.pending if word.start >= time_offset]
+
+
+class WhisperStreamer:
+    """Re-decode a growing 16 kHz buffer and emit partial/final sentences
+
+    decode_words(audio, prompt) must return a list of Word with times relative
+    to the start of ``audio``. on_result(text, is_final) is called from the
+    decode thread.
+    """
+
+    sample_rate = 16000
+
+    def __init__(self, decode_words, on_result, interval: float = 1.0, max_buffer: float = 15.0,
+                 prompt_chars: int = 100):
+        self.decode_words = decode_words
+        self.on_result = on_result
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self.prompt_chars = prompt_chars
+
+        self.agreement = LocalAgreement()
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_offset = 0.0     # absolute time of buffer[0]
+        self.sentence = []           # committed words of the unfinished sentence
+        self.history = ""            # finalized text, used as decoding prompt
+        self.last_partial = ""
+
+        self._lock = threading.Lock()
+        self._new_audio = threading.Event()
+        self._received = 0           # samples pushed since the last decode
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='whisper-stream', daemon=True)
+        self.thread.start()
+
+    def push(self, audio: np.ndarray):
+        """Append 16 kHz float32 samples"""
+        with self._lock:
+            self.buffer = np.concatenate((self.buffer, audio.astype(np.float32, copy=False)))
+            self._received += len(audio)
+        self._new_audio.set()
+
+    def stop(self):
+        """Stop decoding, then finalize whatever is left in the buffer"""
+        self.running = False
+        self._new_audio.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        try:
+            self._decode_once()
+        except Exception as e:
+            print(f"Local streaming decode error: {e}")
+        self._commit(self.agreement.flush())
+        self._finalize(len(self.sentence))
+
+    def _run(self):
+        min_samples = int(self.interval * self.sample_rate)
+        while self.running:
+            self._new_audio.wait(timeout=0.5)
+            self._new_audio.clear()
+            if not self.running:
+                break
+            with self._lock:
+                ready = self._received >= min_samples
+            if not ready:
+                continue
+            started = time.monotonic()
+            try:
+                self._decode_once()
+            except Exception as e:
+                print(f"Local streaming decode error: {e}")
+            # Decoding slower than the interval just lowers the update rate
+            elapsed = time.monotonic() - started
+            if elapsed < self.interval:
+                time.sleep(min(self.interval - elapsed, 0.05))
+
+    def _decode_once(self):
+        with self._lock:
+            audio = self.buffer
+            offset = self.buffer_offset
+            self._received = 0
+        if not len(audio):
+            return
+
+        prompt = (self.history + join_words(self.sentence))[-self.prompt_chars:]
+        words = [Word(w.start + offset, w.end + offset, w.text)
+                 for w in self.decode_words(audio, prompt)]
+        self._commit(self.agreement.insert(words))
+
+        # Cut at the last finished sentence; force a cut when the buffer is too long
+        cut = None
+        for i in range(len(self.sentence) - 1, -1, -1):
+            if SENTENCE_END.search(self.sentence[i].text.strip()):
+                cut = self.sentence[i].end
+                self._finalize(i + 1)
+                break
+        if cut is None and len(audio) / self.sample_rate > self.max_buffer:
+            if self.sentence:
+                cut = self.sentence[-1].end
+                self._finalize(len(self.sentence))
+            else:
+                # Nothing agreed on (silence/noise): keep only the last interval
+                cut = offset + len(audio) / self.sample_rate - self.interval
+        if cut is not None:
+            self._trim(cut)
+
+        partial = join_words(self.sentence + self.agreement.pending)
+        if partial and partial != self.last_partial:
+            self.last_partial = partial
+            self.on_result(partial, False)
+
+    def _commit(self, words):
+        self.sentence.extend(words)
+
+    def _finalize(self, count: int):
+        """Emit the first ``count`` committed words as a final sentence"""
+        words, self.sentence = self.sentence[:count], self.sentence[count:]
+        text = join_words(words)
+        if text:
+            self.history = (self.history + text)[-self.prompt_chars:]
+            self.last_partial = ""
+            self.on_result(text, True)
+
+    def _trim(self, time_offset: float):
+        """Drop buffered audio before time_offset (absolute seconds)"""
+        with self._lock:
+            cut = int((time_offset - self.buffer_offset) * self.sample_rate)
+            cut = min(max(cut, 0), len(self.buffer))
+            self.buffer = self.buffer[cut:]
+            self.buffer_offset += cut / self.sample_rate
+        self.agreement.trim(self.buffer_offset)
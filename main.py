@@ -1,75 +1,71 @@
 import sys
-import threading
 import time
 import signal
 import atexit
+import multiprocessing
 from PyQt5.QtWidgets import QApplication, QMessageBox
 from PyQt5.QtCore import QObject, pyqtSignal, QTimer
 
 from config import Config
 from audio_capture import AudioCapture
-from transcription_service import create_transcription_service
+import service_loader
+import transcription_worker
+from subtitle_server import SubtitleServer
 from subtitle_window import SubtitleWindow
 
 
 class TranscriptionWorker(QObject):
-    """Worker thread for audio transcription"""
+    """Qt wrapper that turns worker results into signals for the UI thread"""
     
-    # Signal to update subtitle
+    # Signal to update subtitle (final sentences)
     subtitle_updated = pyqtSignal(str)
+    # Signal for partial (not yet final) sentences in streaming mode
+    partial_updated = pyqtSignal(str)
     
-    def __init__(self, audio_capture, transcription_service):
+    def __init__(self, audio_capture, transcription_service=None, service_loader=None):
         super().__init__()
-        self.audio_capture = audio_capture
-        self.transcription_service = transcription_service
-        self.running = False
-        self.thread = None
+        self.worker = transcription_worker.TranscriptionWorker(
+            audio_capture,
+            transcription_service,
+            service_loader
+        )
+        self.worker.add_listener(
+            on_subtitle=self.subtitle_updated.emit,
+            on_partial=self.partial_updated.emit
+        )
+        
+    def add_listener(self, on_subtitle=None, on_partial=None):
+        """Register extra callbacks (called on the worker thread)"""
+        self.worker.add_listener(on_subtitle, on_partial)
         
     def start(self):
         """Start transcription worker"""
-        if self.running:
-            return
-            
-        self.running = True
-        self.thread = threading.Thread(target=self._process_audio, daemon=True)
-        self.thread.start()
+        self.worker.start()
         
     def stop(self):
         """Stop transcription worker"""
-        self.running = False
-        if self.thread:
-            self.thread.join(timeout=2)
-            
-    def _process_audio(self):
-        """Process audio chunks and transcribe"""
-        print("Transcription worker started")
+        self.worker.stop()
+
+
+class ServiceLoader(QObject):
+    """Qt wrapper that reports background service loading to the UI thread"""
+    
+    # Emitted with the load time in seconds
+    loaded = pyqtSignal(float)
+    # Emitted with the error message
+    failed = pyqtSignal(str)
+    
+    def __init__(self):
+        super().__init__()
+        self.loader = service_loader.ServiceLoader()
+        self.loader.add_listener(
+            on_ready=lambda service: self.loaded.emit(self.loader.load_seconds),
+            on_failed=lambda error: self.failed.emit(str(error))
+        )
         
-        while self.running:
-            try:
-                # Get audio chunk from queue
-                audio_chunk = self.audio_capture.get_audio_chunk(timeout=0.5)
-                
-                if audio_chunk is not None:
-                    print(f"Processing audio chunk: {len(audio_chunk)} samples")
-                    
-                    # Transcribe audio
-                    text = self.transcription_service.transcribe(
-                        audio_chunk, 
-                        Config.SAMPLE_RATE
-                    )
-                    
-                    # Emit signal with transcribed text
-                    if text and text.strip():
-                        print(f"Transcription: {text}")
-                        self.subtitle_updated.emit(text)
-                    else:
-                        print("No speech detected in audio chunk")
-                        
-            except Exception as e:
-                print(f"Error in transcription worker: {e}")
-                time.sleep(0.1)
-                
-        print("Transcription worker stopped")
+    def start(self):
+        """Start loading the transcription service"""
+        self.loader.start()
 
 
 class AISubtitleApp:
@@ -80,7 +76,9 @@ class AISubtitleApp:
         self.window = SubtitleWindow()
         self.audio_capture = None
         self.transcription_service = None
+        self.service_loader = None
         self.transcription_worker = None
+        self.subtitle_server = None
         self._cleanup_done = False
         
         # Connect signals
@@ -116,20 +114,38 @@ class AISubtitleApp:
             # List available audio devices
             self.audio_capture.list_devices()
             
-            # Initialize transcription service
-            self.transcription_service = create_transcription_service()
-            print("[OK] Transcription service initialized")
+            # Load the transcription service in the background (SDK imports,
+            # local models); capture can start and buffer in the meantime
+            self.service_loader = ServiceLoader()
+            self.service_loader.loaded.connect(self._on_service_loaded)
+            self.service_loader.failed.connect(self._on_service_failed)
+            self.window.set_model_status('loading')
+            self.service_loader.start()
+            print("[..] Loading transcription service in background")
             
             # Initialize transcription worker
             self.transcription_worker = TranscriptionWorker(
                 self.audio_capture,
-                self.transcription_service
+                service_loader=self.service_loader.loader
             )
             self.transcription_worker.subtitle_updated.connect(
                 self.window.update_subtitle
             )
+            self.transcription_worker.partial_updated.connect(
+                self.window.update_partial
+            )
             print("[OK] Transcription worker initialized")
             
+            # Optional fan-out server for other screens / OBS
+            if Config.SUBTITLE_SERVER_ENABLED:
+                self.subtitle_server = SubtitleServer()
+                self.subtitle_server.start()
+                self.transcription_worker.add_listener(
+                    on_subtitle=self.subtitle_server.publish_final,
+                    on_partial=self.subtitle_server.publish_partial
+                )
+                print("[OK] Subtitle server started")
+            
             print("\n=== Initialization Complete ===\n")
             return True
             
@@ -139,6 +155,21 @@ class AISubtitleApp:
             QMessageBox.critical(None, "初始化错误", error_msg)
             return False
             
+    def _on_service_loaded(self, seconds):
+        """Transcription service ready (UI thread)"""
+        self.transcription_service = self.service_loader.loader.service
+        self.window.set_model_status('ready')
+        print(f"[OK] Transcription service initialized ({seconds:.1f}s)")
+        
+    def _on_service_failed(self, message):
+        """Transcription service could not be created (UI thread)"""
+        error_msg = f"Initialization failed: {message}\n\nPlease check your configuration file and API key."
+        print(f"Error: {error_msg}")
+        if self.window.recording:
+            self.window.on_stop_clicked()
+        self.window.set_model_status('failed', "转录服务加载失败，请检查配置")
+        QMessageBox.critical(self.window, "初始化错误", error_msg)
+            
     def start_capture(self):
         """Start audio capture and transcription"""
         try:
@@ -178,10 +209,13 @@ class AISubtitleApp:
             
     def run(self):
         """Run the application"""
+        # Show the window first; slow service loading happens in the background
+        self.window.show()
+        self.app.processEvents()
+        
         if not self.initialize():
             return 1
             
-        self.window.show()
         return self.app.exec_()
         
     def _signal_handler(self, signum, frame):
@@ -206,6 +240,10 @@ class AISubtitleApp:
             # Stop capture
             self.stop_capture()
             
+            # Stop subtitle server
+            if self.subtitle_server:
+                self.subtitle_server.stop()
+            
             # Force cleanup of audio stream
             if self.audio_capture and hasattr(self.audio_capture, 'stream'):
                 if self.audio_capture.stream:
@@ -246,4 +284,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Needed for inference processes in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,214 @@
+"""
+进程隔离的本地推理模块
+在独立的工作进程中运行本地Whisper模型，音频通过共享内存传递，结果通过管道返回，
+避免模型推理与界面事件循环、音频回调争夺GIL；多核机器上可运行多个解码进程
+"""
+import os
+import atexit
+import queue
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+from config import Config
+from transcription_service import TranscriptionService
+import latency
+
+# Initial shared memory per process (seconds of audio); grown on demand
+INITIAL_BUFFER_SECONDS = 30
+
+
+def _worker_main(conn, service_class, threads):
+    """Entry point of a decoder process: load the model, then serve requests"""
+    # Split the cores between decoder processes instead of oversubscribing them
+    if threads:
+        os.environ['OMP_NUM_THREADS'] = str(threads)
+        if not Config.FASTER_WHISPER_CPU_THREADS:
+            Config.FASTER_WHISPER_CPU_THREADS = threads
+
+    try:
+        service = service_class()
+    except Exception as e:
+        conn.send(('error', str(e)))
+        return
+    conn.send(('ready', None))
+
+    shm = None
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            if request is None:
+                break
+
+            name, length, sample_rate = request
+            if shm is None or shm.name != name:
+                # The parent replaced the segment with a larger one
+                if shm is not None:
+                    shm.close()
+                # Spawned children share the parent's resource tracker, so the
+                # segment is not unlinked when this process exits
+                shm = shared_memory.SharedMemory(name=name)
+
+            audio = np.ndarray((length,), dtype=np.float32, buffer=shm.buf)
+            # Failures are reported to the parent, which records them for failover
+            text, error = service.transcribe_with_error(audio, sample_rate)
+            del audio
+            conn.send((text, str(error) if error is not None else None))
+    finally:
+        if shm is not None:
+            shm.close()
+
+
+class InferenceProcess:
+    """One decoder process with its own shared memory segment and pipe"""
+
+    def __init__(self, context, service_class, threads: int):
+        self.context = context
+        self.service_class = service_class
+        self.threads = threads
+        self.process = None
+        self.conn = None
+        self.shm = None
+
+    def start(self):
+        """Spawn the process (the model loads in the child)"""
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main,
+            args=(child_conn, self.service_class, self.threads),
+            name='inference-process',
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def wait_ready(self):
+        """Block until the model is loaded; raise if loading failed"""
+        try:
+            status, message = self.conn.recv()
+        except EOFError:
+            raise RuntimeError(f"Inference process exited with code {self.process.exitcode}")
+        if status != 'ready':
+            raise RuntimeError(f"Inference process failed to load model: {message}")
+
+    def _ensure_capacity(self, samples: int):
+        size = samples * 4
+        if self.shm is not None and self.shm.size >= size:
+            return
+        self._release_shm()
+        size = max(size, Config.SAMPLE_RATE * INITIAL_BUFFER_SECONDS * 4)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int):
+        """Copy audio into shared memory and wait for the child's (text, error)"""
+        length = len(audio_data)
+        self._ensure_capacity(length)
+        view = np.ndarray((length,), dtype=np.float32, buffer=self.shm.buf)
+        view[:] = audio_data
+        del view
+        latency.stamp('encode')
+
+        latency.stamp('send')
+        self.conn.send((self.shm.name, length, sample_rate))
+        result = self.conn.recv()
+        latency.stamp('response')
+        return result
+
+    def restart(self):
+        """Replace a crashed process"""
+        self.stop()
+        self.start()
+        self.wait_ready()
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=1)
+        self.conn.close()
+        self.process = None
+
+    def _release_shm(self):
+        if self.shm is None:
+            return
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+    def close(self):
+        self.stop()
+        self._release_shm()
+
+
+class ProcessInferenceService(TranscriptionService):
+    """Run a local transcription service in one or more worker processes
+
+    Each process loads its own copy of the model. transcribe() borrows an
+    idle process, so with several processes it can be called concurrently.
+    """
+
+    def __init__(self, service_class, processes: int = 1):
+        self.processes = max(1, processes)
+        self.supports_concurrency = self.processes > 1
+        threads = max(1, (os.cpu_count() or 1) // self.processes)
+        context = multiprocessing.get_context('spawn')
+
+        self.workers = [InferenceProcess(context, service_class, threads)
+                        for _ in range(self.processes)]
+        self._idle = queue.Queue()
+        atexit.register(self.close)
+
+        print(f"Starting {self.processes} inference process(es) "
+              f"for {service_class.__name__} ({threads} threads each)...")
+        # Start all first so the models load in parallel
+        for worker in self.workers:
+            worker.start()
+        try:
+            for worker in self.workers:
+                worker.wait_ready()
+                self._idle.put(worker)
+        except Exception:
+            self.close()
+            raise
+        print("Inference processes ready")
+
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int) -> str:
+        """Transcribe on the next idle process"""
+        if audio_data.dtype != np.float32:
+            audio_data = audio_data.astype(np.float32)
+
+        worker = self._idle.get()
+        try:
+            text, error = worker.transcribe(audio_data, sample_rate)
+        except (EOFError, OSError) as e:
+            print(f"Inference process failed ({e!r}), restarting it")
+            try:
+                worker.restart()
+            except Exception as restart_error:
+                print(f"Error restarting inference process: {restart_error}")
+            return self._fail(e)
+        finally:
+            self._idle.put(worker)
+        if error is not None:
+            self._fail(RuntimeError(error))
+        return text
+
+    def close(self):
+        """Stop all processes and free their shared memory"""
+        for worker in self.workers:
+            try:
+                worker.close()
+            except Exception as e:
+                print(f"Error stopping inference process: {e}")
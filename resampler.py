@@ -0,0 +1,123 @@
+"""
+多相重采样模块
+抗混叠的多相FIR重采样器：每对(原采样率, 目标采样率)只设计一次滤波器，
+流式处理时在音频块之间保留滤波器状态，输出连续无缝
+"""
+import functools
+import math
+import numpy as np
+
+# Filter zero crossings on each side of the centre tap (quality vs. cost)
+ZERO_CROSSINGS = 16
+# Cutoff as a fraction of the lower Nyquist frequency
+ROLLOFF = 0.9
+KAISER_BETA = 8.6
+# Outputs computed per vectorized block (bounds temporary memory)
+BLOCK_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=None)
+def get_filter(orig_sr: int, target_sr: int):
+    """Return (up, down, polyphase filter bank) for a rate pair, computed once
+
+    The bank has shape (up, taps_per_phase); row p holds the taps applied to
+    the newest input samples first for output phase p.
+    """
+    divisor = math.gcd(int(orig_sr), int(target_sr))
+    up, down = int(target_sr) // divisor, int(orig_sr) // divisor
+
+    # Windowed-sinc low-pass at the lower of the two Nyquist frequencies,
+    # designed at the virtual upsampled rate orig_sr * up
+    taps_per_phase = 2 * int(math.ceil(ZERO_CROSSINGS * max(up, down) / up))
+    length = taps_per_phase * up
+    cutoff = ROLLOFF / (2 * max(up, down))  # cycles per upsampled sample
+    t = np.arange(length) - (length - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(length, KAISER_BETA)
+    # Unity DC gain after zero-stuffing by `up`
+    taps *= up / taps.sum()
+
+    # taps[p + k * up] multiplies the k-th most recent input sample for phase p
+    bank = taps.reshape(taps_per_phase, up).T.astype(np.float32)
+    bank.setflags(write=False)
+    return up, down, bank
+
+
+class Resampler:
+    """Streaming polyphase resampler for mono float32 audio
+
+    process() may be called with chunks of any size; the filter history and
+    output phase carry over, so concatenated outputs equal resampling the
+    concatenated input. Output lags the input by the filter's group delay
+    (about ZERO_CROSSINGS input samples).
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int):
+        self.orig_sr = int(orig_sr)
+        self.target_sr = int(target_sr)
+        self.passthrough = self.orig_sr == self.target_sr
+        self.up, self.down, self.bank = get_filter(self.orig_sr, self.target_sr)
+        self.taps_per_phase = self.bank.shape[1]
+        self.reset()
+
+    @property
+    def delay(self) -> float:
+        """Group delay in output samples"""
+        return (self.bank.size - 1) / 2 / self.down
+
+    def reset(self):
+        """Clear the filter history (start of a new stream)"""
+        self._history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+        # Position of the next output in upsampled units, relative to the next input
+        self._position = 0
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        """Resample one chunk, returning the outputs it completes"""
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if self.passthrough:
+            return audio
+        if not len(audio):
+            return np.zeros(0, dtype=np.float32)
+
+        history = len(self._history)
+        buffer = np.concatenate((self._history, audio))
+
+        # Outputs whose newest input sample falls inside this chunk
+        count = max(0, -(-(len(audio) * self.up - self._position) // self.down))
+        output = np.empty(count, dtype=np.float32)
+        offsets = np.arange(self.taps_per_phase)
+        for start in range(0, count, BLOCK_SIZE):
+            positions = self._position + np.arange(start, min(start + BLOCK_SIZE, count)) * self.down
+            inputs, phases = np.divmod(positions, self.up)
+            frames = buffer[(inputs + history)[:, None] - offsets[None, :]]
+            output[start:start + len(positions)] = np.einsum('ij,ij->i', frames, self.bank[phases])
+
+        self._position += count * self.down - len(audio) * self.up
+        self._history = buffer[-history:] if history else self._history
+        return output
+
+    def flush(self) -> np.ndarray:
+        """Emit the outputs still held back by the filter delay and reset"""
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        tail = self.process(np.zeros(int(math.ceil(self.delay * self.down / self.up)) + 1,
+                                     dtype=np.float32))
+        self.reset()
+        return tail
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """Resample a complete signal, compensating the filter delay
+
+    Output length is round(len(audio) * target_sr / orig_sr).
+    """
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    if int(orig_sr) == int(target_sr):
+        return audio
+    resampler = Resampler(orig_sr, target_sr)
+    output = np.concatenate((resampler.process(audio), resampler.flush()))
+    start = int(round(resampler.delay))
+    length = int(round(len(audio) * resampler.target_sr / resampler.orig_sr))
+    output = output[start:start + length]
+    if len(output) < length:
+        output = np.pad(output, (0, length - len(output)))
+    return output
@@ -0,0 +1,336 @@
+"""
+多服务容错模块
+组合多个转录服务以降低尾延迟、容忍服务故障：
+- 对冲请求（主服务在对冲延迟内未返回时，同时发给备用服务，采用先返回的结果）
+- 熔断与故障转移（服务连续出错或超时后暂停调用，按备用链切换到下一个服务，
+  冷却后以单个请求试探，恢复后切回）
+"""
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+import numpy as np
+
+from config import Config
+from transcription_service import TranscriptionService
+import latency
+
+# Hedge delay before the primary has enough latency samples (seconds)
+INITIAL_HEDGE_DELAY = 1.5
+# Primary latency samples needed before the percentile is trusted
+MIN_HEDGE_SAMPLES = 10
+# Calls in the breaker window needed before the error rate is trusted
+MIN_BREAKER_CALLS = 3
+
+
+class _RaceTrace:
+    """Forward stamps to a chunk's trace until the race is decided
+
+    The losing request keeps running after the chunk has been emitted; its
+    late stamps must not overwrite the winner's.
+    """
+
+    __slots__ = ('trace', 'open')
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.open = True
+
+    def stamp(self, stage: str):
+        if self.open:
+            self.trace.stamp(stage)
+
+
+class HedgedTranscriptionService(TranscriptionService):
+    """Send each chunk to the primary, and also to the secondary if it is slow
+
+    If the primary has not answered within the hedge delay, the chunk is sent
+    to the secondary as well and the first successful result wins; the other
+    request runs to completion and is ignored. A primary that fails before
+    the delay is hedged at once. The delay is HEDGE_DELAY seconds, or
+    when that is 0 the HEDGE_PERCENTILE of the primary's recent latencies, so
+    only about (1 - percentile) of the chunks cause a duplicate request.
+    A service without supports_concurrency never gets two calls at once: the
+    primary waits for its previous (losing) call, and a busy secondary is
+    not hedged to. Streaming sessions go to the primary only.
+    """
+
+    def __init__(self, primary: TranscriptionService, secondary: TranscriptionService,
+                 delay: float = None, percentile: float = None, window: int = 100):
+        self.primary = primary
+        self.secondary = secondary
+        self.fixed_delay = Config.HEDGE_DELAY if delay is None else delay
+        self.percentile = Config.HEDGE_PERCENTILE if percentile is None else percentile
+        self.supports_concurrency = primary.supports_concurrency and secondary.supports_concurrency
+        self.supports_streaming = primary.supports_streaming
+
+        # Requests that lost the race keep running, so leave room for them
+        workers = 4 * max(1, Config.TRANSCRIPTION_CONCURRENCY)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hedge')
+        self._primary_latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        # Held for the whole call by services that cannot run two at once
+        self._primary_busy = None if primary.supports_concurrency else threading.Lock()
+        self._secondary_busy = None if secondary.supports_concurrency else threading.Lock()
+
+        self.chunks = 0
+        self.hedged = 0
+        self.secondary_wins = 0
+
+    @property
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary before hedging"""
+        if self.fixed_delay > 0:
+            return self.fixed_delay
+        with self._lock:
+            samples = list(self._primary_latencies)
+        if len(samples) < MIN_HEDGE_SAMPLES:
+            return INITIAL_HEDGE_DELAY
+        return float(np.percentile(samples, self.percentile * 100))
+
+    def _timed_primary(self, audio_data: np.ndarray, sample_rate: int, trace):
+        if self._primary_busy is not None:
+            self._primary_busy.acquire()
+        # Executor threads have no trace of their own
+        latency.set_current_trace(trace)
+        started = time.monotonic()
+        try:
+            return self.primary.transcribe_with_error(audio_data, sample_rate)
+        finally:
+            latency.set_current_trace(None)
+            # Recorded even when the secondary won, so slow requests count
+            with self._lock:
+                self._primary_latencies.append(time.monotonic() - started)
+            if self._primary_busy is not None:
+                self._primary_busy.release()
+
+    def _run_secondary(self, audio_data: np.ndarray, sample_rate: int, trace):
+        """Call the secondary; _secondary_busy is already held by the caller"""
+        latency.set_current_trace(trace)
+        try:
+            return self.secondary.transcribe_with_error(audio_data, sample_rate)
+        finally:
+            latency.set_current_trace(None)
+            if self._secondary_busy is not None:
+                self._secondary_busy.release()
+
+    def _claim_secondary(self) -> bool:
+        """Whether the secondary can take a hedge now (claims it if non-concurrent)"""
+        return self._secondary_busy is None or self._secondary_busy.acquire(blocking=False)
+
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int) -> str:
+        """Transcribe with the primary, hedged by the secondary"""
+        latency.stamp('send')
+        current = latency.get_current_trace()
+        trace = _RaceTrace(current) if current is not None else None
+        primary = self.executor.submit(self._timed_primary, audio_data, sample_rate, trace)
+        winner = primary
+        hedged = False
+        done = wait([primary], timeout=self.hedge_delay).done
+        # A primary that failed fast is hedged right away
+        if (not done or primary.result()[1] is not None) and self._claim_secondary():
+            hedged = True
+            secondary = self.executor.submit(self._run_secondary, audio_data, sample_rate, trace)
+            # First successful result, or the last failure
+            for winner in as_completed([primary, secondary]):
+                if winner.result()[1] is None:
+                    break
+        if trace is not None:
+            trace.open = False
+        latency.stamp('response')
+
+        with self._lock:
+            self.chunks += 1
+            self.hedged += hedged
+            self.secondary_wins += winner is not primary
+        text, error = winner.result()
+        if error is not None:
+            self._fail(error)
+        return text
+
+    def warm_up(self, connections: int = 1):
+        self.primary.warm_up(connections)
+        self.secondary.warm_up(connections)
+
+    def cool_down(self):
+        self.primary.cool_down()
+        self.secondary.cool_down()
+        if self.chunks:
+            print(f"Hedging: {self.hedged}/{self.chunks} chunks hedged "
+                  f"({self.hedged / self.chunks * 100:.1f}% duplicate requests), "
+                  f"secondary won {self.secondary_wins}, "
+                  f"current delay {self.hedge_delay * 1000:.0f}ms")
+
+    def start_stream(self, sample_rate: int, on_result):
+        self.primary.start_stream(sample_rate, on_result)
+
+    def send_audio(self, audio_data: np.ndarray):
+        self.primary.send_audio(audio_data)
+
+    def stop_stream(self):
+        self.primary.stop_stream()
+
+    def get_stats(self):
+        """获取对冲统计信息"""
+        return {
+            'chunks': self.chunks,
+            'hedged': self.hedged,
+            'secondary_wins': self.secondary_wins,
+            'hedge_delay_ms': round(self.hedge_delay * 1000, 1),
+        }
+
+
+class CircuitBreaker:
+    """Per-provider circuit breaker (closed -> open -> half-open -> closed)
+
+    Closed: every call goes through; the breaker opens when at least
+    BREAKER_ERROR_RATE of the last BREAKER_WINDOW calls failed, or at once
+    when a call fails after more than BREAKER_SLOW_SECONDS (a timeout), so an
+    outage costs one timeout rather than one per chunk. Calls that succeed
+    but take longer than BREAKER_SLOW_SECONDS count as failures.
+    Open: calls are refused for BREAKER_OPEN_SECONDS.
+    Half-open: a single probe call is let through; success closes the
+    breaker, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, error_rate: float = None, window: int = None,
+                 slow_seconds: float = None, open_seconds: float = None):
+        self.name = name
+        self.error_rate = Config.BREAKER_ERROR_RATE if error_rate is None else error_rate
+        self.slow_seconds = Config.BREAKER_SLOW_SECONDS if slow_seconds is None else slow_seconds
+        self.open_seconds = Config.BREAKER_OPEN_SECONDS if open_seconds is None else open_seconds
+        window = Config.BREAKER_WINDOW if window is None else window
+
+        self.state = self.CLOSED
+        self._results = collections.deque(maxlen=max(1, window))  # True = failed
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+        self.trips = 0
+        self.rejected = 0
+
+    def allow_request(self) -> bool:
+        """Whether a call may be made now (claims the probe when half-open)"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, error, elapsed: float):
+        """Record the outcome of an allowed call"""
+        slow = elapsed > self.slow_seconds
+        failed = error is not None or slow
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open(f"probe failed: {error or f'took {elapsed:.1f}s'}")
+                else:
+                    self.state = self.CLOSED
+                    self._results.clear()
+                    print(f"[Breaker] {self.name} recovered, circuit closed")
+                return
+            if self.state != self.CLOSED:
+                # A call that started before the breaker opened
+                return
+
+            self._results.append(failed)
+            failures = sum(self._results)
+            if error is not None and slow:
+                self._open(f"failed after {elapsed:.1f}s: {error}")
+            elif len(self._results) >= MIN_BREAKER_CALLS and failures / len(self._results) >= self.error_rate:
+                self._open(f"{failures}/{len(self._results)} recent calls failed or were slow")
+
+    def _open(self, reason: str):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._results.clear()
+        self.trips += 1
+        print(f"[Breaker] {self.name} circuit open for {self.open_seconds:.0f}s ({reason})")
+
+    def get_stats(self):
+        """获取熔断统计信息"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'trips': self.trips,
+                'rejected': self.rejected,
+            }
+
+
+class FailoverTranscriptionService(TranscriptionService):
+    """Try providers in order, skipping those whose circuit breaker is open
+
+    ``services`` is a list of (name, service), primary first. A chunk goes to
+    the first provider whose breaker allows it; if that call fails, the same
+    chunk is retried on the next one. Once the primary's breaker lets a probe
+    through and it succeeds, traffic returns to the primary. Streaming
+    sessions go to the primary only.
+    """
+
+    def __init__(self, services):
+        self.services = [(name, service, CircuitBreaker(name)) for name, service in services]
+        primary = self.services[0][1]
+        self.supports_streaming = primary.supports_streaming
+        self.supports_concurrency = all(service.supports_concurrency for _, service, _ in self.services)
+        self.active = self.services[0][0]
+        self.failovers = 0
+
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int) -> str:
+        """Transcribe with the first healthy provider in the chain"""
+        error = None
+        for name, service, breaker in self.services:
+            if not breaker.allow_request():
+                continue
+            started = time.monotonic()
+            text, error = service.transcribe_with_error(audio_data, sample_rate)
+            breaker.record(error, time.monotonic() - started)
+            if error is None:
+                if name != self.active:
+                    print(f"[Failover] Transcribing with {name} (was {self.active})")
+                    self.active = name
+                    self.failovers += 1
+                return text
+
+        if error is None:
+            error = RuntimeError("every provider's circuit is open")
+        return self._fail(error)
+
+    def warm_up(self, connections: int = 1):
+        for _, service, _ in self.services:
+            service.warm_up(connections)
+
+    def cool_down(self):
+        for _, service, _ in self.services:
+            service.cool_down()
+        trips = ", ".join(f"{name} {breaker.trips}" for name, _, breaker in self.services)
+        print(f"Failover: {self.failovers} switches, circuit trips: {trips}")
+
+    def start_stream(self, sample_rate: int, on_result):
+        self.services[0][1].start_stream(sample_rate, on_result)
+
+    def send_audio(self, audio_data: np.ndarray):
+        self.services[0][1].send_audio(audio_data)
+
+    def stop_stream(self):
+        self.services[0][1].stop_stream()
+
+    def get_stats(self):
+        """获取故障转移统计信息"""
+        return {
+            'active': self.active,
+            'failovers': self.failovers,
+            'breakers': {name: breaker.get_stats() for name, _, breaker in self.services},
+        }
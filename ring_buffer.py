@@ -0,0 +1,106 @@
+"""
+音频环形缓冲区模块
+固定容量、基于numpy数组的float32环形缓冲区，用于音频回调线程与处理线程之间传递采样数据
+"""
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Fixed-capacity float32 ring buffer (single producer, single consumer)
+
+    The producer (audio callback) only advances ``_write_pos`` and the consumer
+    only advances ``_read_pos``. Both are plain Python ints whose assignment is
+    atomic under the GIL, so no lock is needed for one writer and one reader.
+    Samples are stored in one preallocated contiguous array; no per-sample
+    Python objects are created.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive")
+        self.capacity = int(capacity)
+        self._data = np.zeros(self.capacity, dtype=np.float32)
+        # Monotonic counters; index into _data is counter % capacity
+        self._write_pos = 0
+        self._read_pos = 0
+
+        # Overflow statistics
+        self.overflow_count = 0
+        self.dropped_samples = 0
+
+    def available(self) -> int:
+        """Number of samples ready to be read"""
+        return self._write_pos - self._read_pos
+
+    def free_space(self) -> int:
+        """Number of samples that can be written without overflow"""
+        return self.capacity - self.available()
+
+    def write(self, samples: np.ndarray) -> int:
+        """Write samples (producer side). Returns the number of samples written.
+
+        When the buffer is full, the samples that do not fit are dropped and
+        counted in ``overflow_count`` / ``dropped_samples``.
+        """
+        count = len(samples)
+        free = self.free_space()
+        if count > free:
+            self.overflow_count += 1
+            self.dropped_samples += count - free
+            samples = samples[:free]
+            count = free
+        if count == 0:
+            return 0
+
+        start = self._write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        if first < count:
+            self._data[:count - first] = samples[first:]
+
+        # Publish only after data is in place
+        self._write_pos += count
+        return count
+
+    def peek(self, count: int, out: np.ndarray = None) -> np.ndarray:
+        """Copy the next ``count`` samples without consuming them
+
+        If ``out`` is given, samples are copied into it (no allocation).
+        Raises ValueError if fewer than ``count`` samples are available.
+        """
+        if count > self.available():
+            raise ValueError(f"Requested {count} samples, only {self.available()} available")
+        if out is None:
+            out = np.empty(count, dtype=np.float32)
+
+        start = self._read_pos % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self._data[start:start + first]
+        if first < count:
+            out[first:count] = self._data[:count - first]
+        return out[:count]
+
+    def skip(self, count: int) -> int:
+        """Discard up to ``count`` samples (consumer side). Returns samples skipped"""
+        count = min(count, self.available())
+        self._read_pos += count
+        return count
+
+    def read(self, count: int, out: np.ndarray = None) -> np.ndarray:
+        """Consume and return the next ``count`` samples (consumer side)"""
+        chunk = self.peek(count, out)
+        self._read_pos += count
+        return chunk
+
+    def clear(self):
+        """Drop all buffered samples (consumer side)"""
+        self._read_pos = self._write_pos
+
+    def get_stats(self):
+        """获取缓冲区统计信息"""
+        return {
+            'capacity': self.capacity,
+            'available': self.available(),
+            'overflow_count': self.overflow_count,
+            'dropped_samples': self.dropped_samples
+        }
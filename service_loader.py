@@ -0,0 +1,76 @@
+"""
+转录服务后台加载模块
+在后台线程中创建转录服务（导入SDK、加载本地模型），使界面可以立即显示、音频捕获可以提前开始缓冲
+"""
+import threading
+import time
+
+from transcription_service import create_transcription_service
+
+
+class ServiceLoader:
+    """Create the transcription service on a background thread
+
+    ``state`` moves from 'idle' to 'loading' and then to 'ready' or
+    'failed'. Listeners registered with add_listener() are called on the
+    loader thread: on_ready(service) or on_failed(error).
+    """
+
+    def __init__(self, factory=create_transcription_service):
+        self.factory = factory
+        self.state = 'idle'
+        self.service = None
+        self.error = None
+        self.load_seconds = None
+        self.thread = None
+        self.ready_listeners = []
+        self.failed_listeners = []
+        self._done = threading.Event()
+
+    def add_listener(self, on_ready=None, on_failed=None):
+        """Register callbacks for load completion and failure"""
+        if on_ready is not None:
+            self.ready_listeners.append(on_ready)
+        if on_failed is not None:
+            self.failed_listeners.append(on_failed)
+
+    def start(self):
+        """Start loading in the background"""
+        if self.thread is not None:
+            return
+        self.state = 'loading'
+        self.thread = threading.Thread(target=self._run, name='service-loader', daemon=True)
+        self.thread.start()
+
+    def wait(self, timeout=None) -> bool:
+        """Wait until loading finished (successfully or not), True if it has"""
+        return self._done.wait(timeout)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == 'ready'
+
+    def _run(self):
+        started = time.monotonic()
+        try:
+            service = self.factory()
+        except Exception as e:
+            self.error = e
+            self.state = 'failed'
+            self._done.set()
+            self._publish(self.failed_listeners, e)
+            return
+
+        self.service = service
+        self.load_seconds = time.monotonic() - started
+        self.state = 'ready'
+        self._done.set()
+        self._publish(self.ready_listeners, service)
+
+    def _publish(self, listeners, value):
+        """Call every listener, isolating failures"""
+        for listener in listeners:
+            try:
+                listener(value)
+            except Exception as e:
+                print(f"Error in service loader listener: {e}")
@@ -89,7 +89,8 @@ class SettingsWindow(QDialog):
             "aliyun - 阿里云百炼（推荐）",
             "openai - OpenAI Whisper",
             "azure - Azure Speech",
-            "local_whisper - 本地Whisper"
+            "local_whisper - 本地Whisper",
+            "faster_whisper - 本地faster-whisper (int8)"
         ])
         self.ai_service.currentIndexChanged.connect(self.on_service_changed)
         service_layout.addRow("服务类型:", self.ai_service)
@@ -224,9 +225,11 @@ class SettingsWindow(QDialog):
         self.sample_rate.setCurrentText("16000")
         audio_layout.addRow("采样率 (Hz):", self.sample_rate)
         
-        self.chunk_duration = QSpinBox()
-        self.chunk_duration.setRange(1, 10)
-        self.chunk_duration.setValue(3)
+        self.chunk_duration = QDoubleSpinBox()
+        self.chunk_duration.setRange(0.5, 10.0)
+        self.chunk_duration.setDecimals(1)
+        self.chunk_duration.setSingleStep(0.5)
+        self.chunk_duration.setValue(3.0)
         self.chunk_duration.setSuffix(" 秒")
         audio_layout.addRow("音频块时长:", self.chunk_duration)
         
@@ -406,7 +409,8 @@ class SettingsWindow(QDialog):
             'aliyun': 0,
             'openai': 1,
             'azure': 2,
-            'local_whisper': 3
+            'local_whisper': 3,
+            'faster_whisper': 4
         }
         self.ai_service.setCurrentIndex(service_map.get(service, 0))
         
@@ -436,7 +440,7 @@ class SettingsWindow(QDialog):
         
         # 音频
         self.sample_rate.setCurrentText(self.config_data.get('SAMPLE_RATE', '16000'))
-        self.chunk_duration.setValue(int(self.config_data.get('CHUNK_DURATION', '3')))
+        self.chunk_duration.setValue(float(self.config_data.get('CHUNK_DURATION', '3')))
         self.audio_device_index.setValue(int(self.config_data.get('AUDIO_DEVICE_INDEX', '-1')))
         
         # UI
@@ -0,0 +1,306 @@
+"""
+字幕分发服务器模块
+将字幕事件（中间结果与最终结果）推送给任意数量的WebSocket或SSE客户端，并提供OBS可用的HTML叠加页面
+
+路由:
+  /         HTML字幕叠加页面（可作为OBS浏览器源）
+  /events   Server-Sent Events 事件流
+  /ws       WebSocket 事件流
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import threading
+import time
+from config import Config
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OVERLAY_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>AI实时字幕</title>
+<style>
+  html, body { margin: 0; background: transparent; overflow: hidden; }
+  #subtitle {
+    position: fixed; left: 5%; right: 5%; bottom: 8%;
+    text-align: center; color: #fff;
+    font: bold 42px "Microsoft YaHei", "PingFang SC", sans-serif;
+    text-shadow: 0 0 6px #000, 2px 2px 2px #000, -2px -2px 2px #000;
+  }
+  #subtitle.partial { color: #ddd; }
+</style>
+</head>
+<body>
+<div id="subtitle"></div>
+<script>
+  var el = document.getElementById('subtitle');
+  var hideTimer = null;
+  var source = new EventSource('/events');
+  source.onmessage = function (msg) {
+    var event = JSON.parse(msg.data);
+    el.textContent = event.text;
+    el.className = event.type;
+    clearTimeout(hideTimer);
+    hideTimer = setTimeout(function () { el.textContent = ''; }, 5000);
+  };
+</script>
+</body>
+</html>
+"""
+
+
+class SubtitleServer:
+    """Publish subtitle events to WebSocket and SSE clients
+
+    The server runs its own asyncio event loop on a daemon thread. publish()
+    only schedules work on that loop, so the transcription worker never waits
+    on the network. Every client has a bounded queue; when a slow client falls
+    behind, its oldest events are dropped.
+    """
+
+    def __init__(self, host: str = None, port: int = None, client_queue_size: int = 50):
+        self.host = host or Config.SUBTITLE_SERVER_HOST
+        self.port = port or Config.SUBTITLE_SERVER_PORT
+        self.client_queue_size = client_queue_size
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self._clients = set()
+        self._started = threading.Event()
+        self._start_error = None
+
+        # 统计信息
+        self.events_published = 0
+        self.events_dropped = 0
+
+    # ---- public API (any thread) ----
+
+    def start(self):
+        """Start the server thread and wait until it is listening"""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._run, name='subtitle-server', daemon=True)
+        self.thread.start()
+        self._started.wait(timeout=5)
+        if self._start_error is not None:
+            self.thread = None
+            raise self._start_error
+        print(f"Subtitle server listening on http://{self.host}:{self.port}/")
+
+    def stop(self):
+        """Stop the server and disconnect all clients"""
+        if self.loop is None or self.thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2)
+        self.thread = None
+
+    def publish(self, text: str, is_final: bool = True):
+        """Queue a subtitle event for every connected client"""
+        if self.loop is None or not text:
+            return
+        event = {
+            'type': 'final' if is_final else 'partial',
+            'text': text,
+            'timestamp': time.time(),
+        }
+        self.loop.call_soon_threadsafe(self._broadcast, json.dumps(event, ensure_ascii=False))
+
+    def publish_final(self, text: str):
+        self.publish(text, True)
+
+    def publish_partial(self, text: str):
+        self.publish(text, False)
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    # ---- event loop side ----
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle_connection, self.host, self.port)
+            )
+        except Exception as e:
+            self._start_error = e
+            self.loop.close()
+            self.loop = None
+            self._started.set()
+            return
+
+        self._started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loop.close()
+            self.loop = None
+
+    def _broadcast(self, payload: str):
+        self.events_published += 1
+        for queue in list(self._clients):
+            if queue.full():
+                # Slow client: drop its oldest event rather than block anyone
+                queue.get_nowait()
+                self.events_dropped += 1
+            queue.put_nowait(payload)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            _, path, headers = await read_http_request(reader)
+
+            if path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                await self._serve_websocket(reader, writer, headers)
+            elif path == '/events':
+                await self._serve_sse(writer)
+            elif path in ('/', '/index.html'):
+                self._write_response(writer, '200 OK', 'text/html; charset=utf-8',
+                                     OVERLAY_HTML.encode('utf-8'))
+            else:
+                self._write_response(writer, '404 Not Found', 'text/plain', b'Not Found')
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _write_response(self, writer, status, content_type, body):
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + body
+        )
+
+    def _register_client(self):
+        queue = asyncio.Queue(maxsize=self.client_queue_size)
+        self._clients.add(queue)
+        return queue
+
+    async def _serve_sse(self, writer):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Access-Control-Allow-Origin: *\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+        await writer.drain()
+
+        queue = self._register_client()
+        try:
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=15)
+                    writer.write(f"data: {payload}\n\n".encode('utf-8'))
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    writer.write(b": keep-alive\n\n")
+                await writer.drain()
+        finally:
+            self._clients.discard(queue)
+
+    async def _serve_websocket(self, reader, writer, headers):
+        writer.write(websocket_handshake_response(headers))
+        await writer.drain()
+
+        queue = self._register_client()
+        receiver = asyncio.ensure_future(self._websocket_receive(reader, writer))
+        try:
+            while not receiver.done():
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    break
+                writer.write(encode_websocket_frame(getter.result().encode('utf-8')))
+                await writer.drain()
+        finally:
+            receiver.cancel()
+            self._clients.discard(queue)
+
+    async def _websocket_receive(self, reader, writer):
+        """Handle client control frames until the client closes the connection"""
+        while True:
+            opcode, payload = await read_websocket_frame(reader)
+            if opcode == 0x8:  # close
+                writer.write(encode_websocket_frame(payload[:2], opcode=0x8))
+                await writer.drain()
+                return
+            if opcode == 0x9:  # ping
+                writer.write(encode_websocket_frame(payload, opcode=0xA))
+                await writer.drain()
+
+
+async def read_http_request(reader):
+    """Read a request line and headers, returning (method, path, lowercase headers)
+
+    method is an empty string if the connection closed before a request arrived.
+    """
+    request_line = await reader.readline()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    parts = request_line.decode('latin-1').split()
+    method = parts[0] if parts else ''
+    path = parts[1].split('?')[0] if len(parts) >= 2 else '/'
+    return method, path, headers
+
+
+def websocket_handshake_response(headers: dict) -> bytes:
+    """Build the 101 response accepting a WebSocket upgrade request"""
+    key = headers.get('sec-websocket-key', '')
+    accept = base64.b64encode(
+        hashlib.sha1((key + WEBSOCKET_GUID).encode('latin-1')).digest()
+    ).decode('latin-1')
+    return (
+        "HTTP/1.1 101 Switching Protocols\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+    ).encode('latin-1')
+
+
+def encode_websocket_frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    """Encode a single unmasked (server-to-client) WebSocket frame"""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 65536:
+        header += bytes([126]) + struct.pack('!H', length)
+    else:
+        header += bytes([127]) + struct.pack('!Q', length)
+    return header + payload
+
+
+async def read_websocket_frame(reader):
+    """Read one WebSocket frame, returning (opcode, unmasked payload)"""
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import (QWidget, QLabel, QVBoxLayout, QHBoxLayout,
 from PyQt5.QtCore import Qt, QPoint, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont, QColor, QPalette
 from config import Config
+import latency
 
 
 class SubtitleWindow(QWidget):
@@ -16,6 +17,9 @@ class SubtitleWindow(QWidget):
         super().__init__()
         self.dragging = False
         self.offset = QPoint()
+        self.recording = False
+        # Transcription service state: loading, ready or failed
+        self.model_status = 'ready'
         self.init_ui()
         
     def init_ui(self):
@@ -189,32 +193,54 @@ class SubtitleWindow(QWidget):
         
     def on_start_clicked(self):
         """Handle start button click"""
+        self.recording = True
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
-        self.status_label.setText("● 录音中")
-        self.status_label.setStyleSheet("""
-            QLabel {
-                color: #00FF00;
-                font-size: 12px;
-            }
-        """)
-        self.subtitle_label.setText("正在监听音频...")
+        self._update_status()
+        if self.model_status == 'loading':
+            self.subtitle_label.setText("正在监听音频（模型加载中，音频已缓冲）...")
+        else:
+            self.subtitle_label.setText("正在监听音频...")
         self.start_clicked.emit()
         
     def on_stop_clicked(self):
         """Handle stop button click"""
-        self.start_button.setEnabled(True)
+        self.recording = False
+        self.start_button.setEnabled(self.model_status != 'failed')
         self.stop_button.setEnabled(False)
-        self.status_label.setText("● 待机")
-        self.status_label.setStyleSheet("""
-            QLabel {
-                color: #888888;
-                font-size: 12px;
-            }
-        """)
+        self._update_status()
         self.subtitle_label.setText("等待音频输入...")
         self.stop_clicked.emit()
     
+    def set_model_status(self, status: str, message: str = ""):
+        """Show the transcription service state: loading, ready or failed"""
+        self.model_status = status
+        if status == 'failed':
+            self.start_button.setEnabled(False)
+            self.subtitle_label.setText(message or "转录服务加载失败")
+        elif status == 'ready' and self.recording:
+            self.subtitle_label.setText("正在监听音频...")
+        self._update_status()
+    
+    def _update_status(self):
+        """Refresh the status indicator from recording and model state"""
+        if self.model_status == 'failed':
+            text, color = "● 模型加载失败", "#FF5252"
+        elif self.model_status == 'loading':
+            text = "● 录音中 (模型加载中...)" if self.recording else "● 模型加载中..."
+            color = "#FFA500"
+        elif self.recording:
+            text, color = "● 录音中", "#00FF00"
+        else:
+            text, color = "● 待机", "#888888"
+        self.status_label.setText(text)
+        self.status_label.setStyleSheet(f"""
+            QLabel {{
+                color: {color};
+                font-size: 12px;
+            }}
+        """)
+    
     def on_settings_clicked(self):
         """Handle settings button click"""
         from settings_window import SettingsWindow
@@ -224,10 +250,20 @@ class SubtitleWindow(QWidget):
     def update_subtitle(self, text: str):
         """Update subtitle text"""
         if text and text.strip():
-            self.subtitle_label.setText(text)
-            # Auto-hide after 5 seconds
-            self.hide_timer.stop()
-            self.hide_timer.start(5000)
+            self._show_text(text)
+            latency.get_tracker().paint_next()
+        
+    def update_partial(self, text: str):
+        """Show a partial (still changing) sentence from streaming recognition"""
+        if text and text.strip():
+            self._show_text(text)
+    
+    def _show_text(self, text: str):
+        """Set subtitle text and restart the auto-hide timer"""
+        self.subtitle_label.setText(text)
+        # Auto-hide after 5 seconds
+        self.hide_timer.stop()
+        self.hide_timer.start(5000)
         
     def clear_subtitle(self):
         """Clear subtitle text"""
@@ -0,0 +1,87 @@
+"""
+字幕文件写入模块
+按时间戳写出SRT或WebVTT字幕，每写入一条即刷新到磁盘
+"""
+from abc import ABC, abstractmethod
+
+
+def format_timestamp(seconds: float, separator: str) -> str:
+    """Format seconds as HH:MM:SS<sep>mmm"""
+    millis = int(round(max(seconds, 0) * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+class SubtitleWriter(ABC):
+    """Base class for incremental subtitle writers"""
+
+    extension = ''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'w', encoding='utf-8')
+        self.count = 0
+        self.write_header()
+
+    def write_header(self):
+        pass
+
+    @abstractmethod
+    def format_cue(self, index: int, start: float, end: float, text: str) -> str:
+        """Format one numbered cue"""
+        pass
+
+    def write_cue(self, start: float, end: float, text: str):
+        """Append one cue and flush it to disk"""
+        text = text.strip()
+        if not text:
+            return
+        self.count += 1
+        self.file.write(self.format_cue(self.count, start, end, text))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SRTWriter(SubtitleWriter):
+    """SubRip (.srt) writer"""
+
+    extension = '.srt'
+
+    def format_cue(self, index, start, end, text):
+        return (
+            f"{index}\n"
+            f"{format_timestamp(start, ',')} --> {format_timestamp(end, ',')}\n"
+            f"{text}\n\n"
+        )
+
+
+class VTTWriter(SubtitleWriter):
+    """WebVTT (.vtt) writer"""
+
+    extension = '.vtt'
+
+    def write_header(self):
+        self.file.write("WEBVTT\n\n")
+        self.file.flush()
+
+    def format_cue(self, index, start, end, text):
+        return (
+            f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n"
+            f"{text}\n\n"
+        )
+
+
+SUBTITLE_WRITERS = {
+    'srt': SRTWriter,
+    'vtt': VTTWriter,
+}
@@ -0,0 +1,72 @@
+"""
+转录文本拼接模块
+重叠窗口模式下，对齐相邻两段转录文本的重叠部分，只输出新增文本
+"""
+import re
+from difflib import SequenceMatcher
+
+# 中日韩字符逐字切分，其他文字按单词切分
+CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af"
+TOKEN_PATTERN = re.compile(
+    rf"[{CJK_RANGES}]|[^\W_{CJK_RANGES}]+(?:'[^\W_{CJK_RANGES}]+)*"
+)
+
+
+class TranscriptStitcher:
+    """Remove text duplicated by overlapping audio windows
+
+    Consecutive windows share ``window - hop`` seconds of audio, so the tail of
+    the previous transcript and the head of the next one describe the same
+    speech. The stitcher aligns them on tokens (characters for CJK, words
+    otherwise) and returns only the text after the overlap.
+    """
+
+    def __init__(self, max_overlap_tokens: int = 60, min_match_tokens: int = 2, slack_tokens: int = 4):
+        self.max_overlap_tokens = max_overlap_tokens
+        self.min_match_tokens = min_match_tokens
+        # Tokens at a window edge are often cut mid-word and mis-recognized
+        self.slack_tokens = slack_tokens
+        self.previous = ""
+
+    def stitch(self, text: str) -> str:
+        """Return the part of ``text`` not already covered by the previous transcript"""
+        text = (text or "").strip()
+        previous = self.previous
+        self.previous = text
+        if not text or not previous:
+            return text
+
+        cut = self._find_overlap_end(previous, text)
+        if cut is None:
+            return text
+        return text[cut:].lstrip(" ,.;:!?，。；：！？、")
+
+    def reset(self):
+        """Forget the previous transcript"""
+        self.previous = ""
+
+    def _find_overlap_end(self, previous: str, text: str):
+        """Character offset in ``text`` where the overlap ends, or None"""
+        prev_tokens = [m.group().lower() for m in TOKEN_PATTERN.finditer(previous)]
+        prev_tokens = prev_tokens[-self.max_overlap_tokens:]
+        matches = list(TOKEN_PATTERN.finditer(text))[:self.max_overlap_tokens]
+        new_tokens = [m.group().lower() for m in matches]
+        if not prev_tokens or not new_tokens:
+            return None
+
+        matcher = SequenceMatcher(None, prev_tokens, new_tokens, autojunk=False)
+        best = None
+        for block in matcher.get_matching_blocks():
+            if block.size < self.min_match_tokens:
+                continue
+            # Overlap must sit at the end of the previous text and the start of the new one
+            if len(prev_tokens) - (block.a + block.size) > self.slack_tokens:
+                continue
+            if block.b > self.slack_tokens:
+                continue
+            if best is None or block.size > best.size:
+                best = block
+
+        if best is None:
+            return None
+        return matches[best.b + best.size - 1].end()
@@ -1,130 +1,459 @@
 import io
-import wave
+import os
+import time
+import threading
 import numpy as np
 from abc import ABC, abstractmethod
 from config import Config
+import latency
+
+# Per-thread errors of the current transcribe() calls, keyed by service id
+_call_errors = threading.local()
+# Guards the lazy negotiation of upload encoders
+_encoder_lock = threading.Lock()
 
 
 class TranscriptionService(ABC):
     """Abstract base class for transcription services"""
     
+    # Whether the service can keep one recognition session open and accept
+    # audio frames as they arrive (see start_stream/send_audio/stop_stream)
+    supports_streaming = False
+    
+    # Whether transcribe() may be called from several threads at once
+    supports_concurrency = True
+    
+    # Upload formats the provider accepts, best first (see audio_encoding.py)
+    upload_formats = ('wav',)
+    _upload_encoder = None
+    
     @abstractmethod
     def transcribe(self, audio_data: np.ndarray, sample_rate: int) -> str:
         """Transcribe audio data to text"""
         pass
     
-    def audio_to_wav_bytes(self, audio_data: np.ndarray, sample_rate: int) -> bytes:
-        """Convert numpy audio data to WAV bytes"""
-        # Normalize audio data to int16
-        audio_int16 = (audio_data * 32767).astype(np.int16)
+    def transcribe_with_error(self, audio_data: np.ndarray, sample_rate: int):
+        """transcribe(), also returning why it failed (None on success)
         
-        # Create WAV file in memory
-        wav_buffer = io.BytesIO()
-        with wave.open(wav_buffer, 'wb') as wav_file:
-            wav_file.setnchannels(1)  # Mono
-            wav_file.setsampwidth(2)  # 2 bytes (int16)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(audio_int16.tobytes())
+        Services print errors and return "" instead of raising, so callers that
+        need to tell a failure from silence (see resilience.py) use this.
+        """
+        errors = self._call_errors()
+        errors.pop(id(self), None)
+        try:
+            text = self.transcribe(audio_data, sample_rate)
+        except Exception as e:
+            print(f"{type(self).__name__} transcription error: {e}")
+            return "", e
+        finally:
+            error = errors.pop(id(self), None)
+        return text, error
+    
+    def _fail(self, error) -> str:
+        """Record why the current transcribe() call failed; returns the empty result"""
+        self._call_errors()[id(self)] = error
+        return ""
+    
+    @staticmethod
+    def _call_errors() -> dict:
+        errors = getattr(_call_errors, 'errors', None)
+        if errors is None:
+            errors = _call_errors.errors = {}
+        return errors
+    
+    @property
+    def upload_encoder(self):
+        """Encoder negotiated from upload_formats and AUDIO_UPLOAD_FORMAT (created once)"""
+        if self._upload_encoder is None:
+            # Concurrent workers may ask for it at the same time
+            with _encoder_lock:
+                if self._upload_encoder is None:
+                    from audio_encoding import negotiate_encoder
+                    encoder = negotiate_encoder(self.upload_formats, Config.AUDIO_UPLOAD_FORMAT)
+                    print(f"{type(self).__name__} upload format: {encoder.name}")
+                    self._upload_encoder = encoder
+        return self._upload_encoder
+    
+    def encode_upload(self, audio_data: np.ndarray, sample_rate: int) -> bytes:
+        """Encode audio in the negotiated upload format"""
+        data = self.upload_encoder.encode(audio_data, sample_rate)
+        latency.stamp('encode')
+        return data
+    
+    def audio_to_pcm_bytes(self, audio_data: np.ndarray) -> bytes:
+        """Convert numpy audio data to raw 16-bit mono PCM bytes"""
+        pcm = (np.clip(audio_data, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+        latency.stamp('encode')
+        return pcm
+    
+    def warm_up(self, connections: int = 1):
+        """Prepare for a capture session, e.g. open network connections (optional)"""
+        pass
+    
+    def cool_down(self):
+        """Stop background activity started by warm_up() (optional)"""
+        pass
+    
+    def start_stream(self, sample_rate: int, on_result):
+        """Open a streaming session
         
-        wav_buffer.seek(0)
-        return wav_buffer.read()
+        on_result(text, is_final) is called from the SDK thread for every
+        partial (is_final=False) and final (is_final=True) sentence.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+    
+    def send_audio(self, audio_data: np.ndarray):
+        """Push audio frames into the open streaming session"""
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+    
+    def stop_stream(self):
+        """Close the streaming session, flushing pending results"""
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
 
 
 class OpenAITranscriptionService(TranscriptionService):
-    """OpenAI Whisper API transcription service"""
+    """OpenAI Whisper API transcription service
+    
+    Requests share one pooled HTTP client (OPENAI_POOL_SIZE, keep-alive,
+    optional HTTP/2, timeouts). warm_up() opens connections before the first
+    chunk and keeps one alive with a cheap request during long silences, so
+    the first subtitle after a pause does not pay DNS/TLS setup again.
+    """
+    
+    # Lossless first; opus only when chosen explicitly
+    upload_formats = ('flac', 'wav', 'opus')
     
     def __init__(self):
         from openai import OpenAI
+        self.http_client = self._create_http_client()
         self.client = OpenAI(
             api_key=Config.OPENAI_API_KEY,
-            base_url=Config.OPENAI_BASE_URL
+            base_url=Config.OPENAI_BASE_URL,
+            http_client=self.http_client,
+            max_retries=self._max_retries()
         )
         self.model = Config.OPENAI_MODEL
+        
+        self._last_activity = time.monotonic()
+        self._keepalive_stop = threading.Event()
+        self._keepalive_thread = None
+    
+    @staticmethod
+    def _max_retries() -> int:
+        """SDK retries; none when failover or hedging decides what to do with a failure"""
+        if Config.OPENAI_MAX_RETRIES >= 0:
+            return Config.OPENAI_MAX_RETRIES
+        # Each retry of a hung request costs another full OPENAI_TIMEOUT
+        return 0 if (Config.FALLBACK_SERVICES or Config.HEDGE_SERVICE) else 2
+    
+    def _create_http_client(self):
+        """HTTP client with an explicitly sized, keep-alive connection pool"""
+        import httpx
+        http2 = Config.OPENAI_HTTP2
+        if http2:
+            try:
+                import h2
+            except ImportError:
+                print("[WARNING] OPENAI_HTTP2 requires the h2 package: pip install httpx[http2]")
+                http2 = False
+        
+        return httpx.Client(
+            http2=http2,
+            follow_redirects=True,  # as the SDK's default client
+            limits=httpx.Limits(
+                max_connections=Config.OPENAI_POOL_SIZE,
+                max_keepalive_connections=Config.OPENAI_POOL_SIZE,
+                keepalive_expiry=Config.OPENAI_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(Config.OPENAI_TIMEOUT, connect=Config.OPENAI_CONNECT_TIMEOUT)
+        )
+    
+    def _ping(self):
+        """Cheap request that opens or refreshes a pooled connection"""
+        try:
+            # Any response will do; gateways without /models still keep the connection
+            self.http_client.get(
+                f"{str(self.client.base_url).rstrip('/')}/models",
+                headers={'Authorization': f'Bearer {self.client.api_key}'}
+            )
+        except Exception as e:
+            print(f"OpenAI keep-alive request failed: {e}")
+        self._last_activity = time.monotonic()
+    
+    def warm_up(self, connections: int = 1):
+        """Open connections in the background and start keep-alive pings"""
+        connections = max(1, min(connections, Config.OPENAI_POOL_SIZE))
+        for i in range(connections):
+            # Concurrent requests make the pool open separate connections
+            threading.Thread(target=self._ping, name=f'openai-warm-up-{i}', daemon=True).start()
+        
+        if Config.OPENAI_KEEPALIVE_INTERVAL > 0 and self._keepalive_thread is None:
+            self._keepalive_stop.clear()
+            self._keepalive_thread = threading.Thread(
+                target=self._keepalive_loop, name='openai-keep-alive', daemon=True
+            )
+            self._keepalive_thread.start()
+    
+    def cool_down(self):
+        """Stop the keep-alive pings"""
+        self._keepalive_stop.set()
+        if self._keepalive_thread is not None:
+            self._keepalive_thread.join(timeout=2)
+            self._keepalive_thread = None
+    
+    def _keepalive_loop(self):
+        interval = Config.OPENAI_KEEPALIVE_INTERVAL
+        while not self._keepalive_stop.wait(min(interval, 1.0)):
+            if time.monotonic() - self._last_activity >= interval:
+                self._ping()
     
     def transcribe(self, audio_data: np.ndarray, sample_rate: int) -> str:
         """Transcribe audio using OpenAI Whisper API"""
         try:
-            # Convert to WAV bytes
-            wav_bytes = self.audio_to_wav_bytes(audio_data, sample_rate)
+            # Encode in the negotiated upload format
+            audio_bytes = self.encode_upload(audio_data, sample_rate)
             
-            # Create a file-like object
-            audio_file = io.BytesIO(wav_bytes)
-            audio_file.name = "audio.wav"
+            # Create a file-like object (the API detects the format from the name)
+            audio_file = io.BytesIO(audio_bytes)
+            audio_file.name = f"audio.{self.upload_encoder.extension}"
             
             # Call OpenAI API
+            latency.stamp('send')
             response = self.client.audio.transcriptions.create(
                 model=self.model,
                 file=audio_file,
                 response_format="text"
             )
+            latency.stamp('response')
+            self._last_activity = time.monotonic()
             
             return response.strip() if response else ""
             
         except Exception as e:
             print(f"OpenAI transcription error: {e}")
-            return ""
+            return self._fail(e)
 
 
 class AzureTranscriptionService(TranscriptionService):
-    """Azure Speech Service transcription"""
+    """Azure Speech Service transcription
+    
+    Uses continuous recognition, so a chunk with several utterances yields
+    all of them. In streaming mode one recognizer stays open on a push
+    stream; `recognizing` events become partial subtitles and `recognized`
+    events final ones.
+    """
+    
+    supports_streaming = True
+    
+    # Compressed input needs GStreamer on the client, so it is opt-in
+    upload_formats = ('wav', 'flac', 'opus')
+    
+    # Longest wait for the final results after the audio stream is closed
+    FINISH_TIMEOUT = 10
     
     def __init__(self):
         import azure.cognitiveservices.speech as speechsdk
         
+        self.speechsdk = speechsdk
         self.speech_config = speechsdk.SpeechConfig(
             subscription=Config.AZURE_SPEECH_KEY,
             region=Config.AZURE_SPEECH_REGION
         )
         self.speech_config.speech_recognition_language = "zh-CN"  # Chinese, change as needed
+        
+        # Streaming session state
+        self._stream_recognizer = None
+        self._push_stream = None
+        self._stream_sample_rate = Config.SAMPLE_RATE
+        self._stream_on_result = None
+        self._session_open = False
+        self._session_stopped = None
+    
+    def _create_recognizer(self, stream_format=None):
+        """Create a recognizer reading from a new push stream"""
+        speechsdk = self.speechsdk
+        if stream_format is None:
+            stream = speechsdk.audio.PushAudioInputStream()
+        else:
+            stream = speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+        audio_config = speechsdk.audio.AudioConfig(stream=stream)
+        recognizer = speechsdk.SpeechRecognizer(
+            speech_config=self.speech_config,
+            audio_config=audio_config
+        )
+        return recognizer, stream
+    
+    def _pcm_format(self, sample_rate: int):
+        return self.speechsdk.audio.AudioStreamFormat(
+            samples_per_second=sample_rate, bits_per_sample=16, channels=1
+        )
     
     def transcribe(self, audio_data: np.ndarray, sample_rate: int) -> str:
         """Transcribe audio using Azure Speech Service"""
         try:
-            import azure.cognitiveservices.speech as speechsdk
+            speechsdk = self.speechsdk
             
-            # Convert to WAV bytes
-            wav_bytes = self.audio_to_wav_bytes(audio_data, sample_rate)
+            # Encode in the negotiated upload format
+            container = {
+                'flac': speechsdk.AudioStreamContainerFormat.FLAC,
+                'opus': speechsdk.AudioStreamContainerFormat.OGG_OPUS,
+            }.get(self.upload_encoder.name)
+            if container is None:
+                # Raw PCM with its real sample rate (the default stream format is 16 kHz)
+                audio_bytes = self.audio_to_pcm_bytes(audio_data)
+                stream_format = self._pcm_format(sample_rate)
+            else:
+                audio_bytes = self.encode_upload(audio_data, sample_rate)
+                stream_format = speechsdk.audio.AudioStreamFormat(compressed_stream_format=container)
             
-            # Create audio stream
-            stream = speechsdk.audio.PushAudioInputStream()
-            audio_config = speechsdk.audio.AudioConfig(stream=stream)
+            speech_recognizer, stream = self._create_recognizer(stream_format)
             
-            # Create recognizer
-            speech_recognizer = speechsdk.SpeechRecognizer(
-                speech_config=self.speech_config,
-                audio_config=audio_config
-            )
+            # Collect every utterance until the end of the pushed audio
+            texts = []
+            errors = []
+            done = threading.Event()
+            
+            def on_recognized(evt):
+                if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech and evt.result.text:
+                    texts.append(evt.result.text)
+            
+            def on_canceled(evt):
+                if evt.cancellation_details.reason == speechsdk.CancellationReason.Error:
+                    errors.append(evt.cancellation_details.error_details)
+                done.set()
+            
+            speech_recognizer.recognized.connect(on_recognized)
+            speech_recognizer.canceled.connect(on_canceled)
+            speech_recognizer.session_stopped.connect(lambda evt: done.set())
             
             # Push audio data
-            stream.write(wav_bytes)
+            latency.stamp('send')
+            stream.write(audio_bytes)
             stream.close()
             
             # Recognize
-            result = speech_recognizer.recognize_once()
+            speech_recognizer.start_continuous_recognition()
+            finished = done.wait(self.FINISH_TIMEOUT)
+            if not finished:
+                print(f"Azure recognition did not finish within {self.FINISH_TIMEOUT}s")
+            speech_recognizer.stop_continuous_recognition()
+            latency.stamp('response')
             
-            if result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                return result.text
-            elif result.reason == speechsdk.ResultReason.NoMatch:
-                return ""
-            else:
-                print(f"Azure recognition failed: {result.reason}")
-                return ""
+            if errors:
+                print(f"Azure recognition failed: {errors[0]}")
+                self._fail(errors[0])
+            elif not finished:
+                self._fail(TimeoutError(f"recognition did not finish within {self.FINISH_TIMEOUT}s"))
+            return "".join(texts)
                 
         except Exception as e:
             print(f"Azure transcription error: {e}")
-            return ""
+            return self._fail(e)
+    
+    def start_stream(self, sample_rate: int, on_result):
+        """Open a long-lived continuous recognition session"""
+        self._stream_sample_rate = sample_rate
+        self._stream_on_result = on_result
+        self._open_session()
+    
+    def _open_session(self):
+        """Create the push stream and recognizer and start recognizing"""
+        speechsdk = self.speechsdk
+        recognizer, stream = self._create_recognizer(self._pcm_format(self._stream_sample_rate))
+        stopped = threading.Event()
+        
+        def mark_closed():
+            # Late events from a replaced session must not close the new one
+            if self._push_stream is stream:
+                self._session_open = False
+        
+        def on_recognizing(evt):
+            if evt.result.text and self._stream_on_result:
+                self._stream_on_result(evt.result.text, False)
+        
+        def on_recognized(evt):
+            if (evt.result.reason == speechsdk.ResultReason.RecognizedSpeech
+                    and evt.result.text and self._stream_on_result):
+                self._stream_on_result(evt.result.text, True)
+        
+        def on_canceled(evt):
+            if evt.cancellation_details.reason == speechsdk.CancellationReason.Error:
+                mark_closed()
+                print(f"[Azure Error] Streaming: {evt.cancellation_details.error_details}")
+        
+        def on_session_stopped(evt):
+            mark_closed()
+            stopped.set()
+            print("[Azure] Streaming session closed")
+        
+        recognizer.recognizing.connect(on_recognizing)
+        recognizer.recognized.connect(on_recognized)
+        recognizer.canceled.connect(on_canceled)
+        recognizer.session_stopped.connect(on_session_stopped)
+        
+        self._stream_recognizer = recognizer
+        self._push_stream = stream
+        self._session_stopped = stopped
+        self._session_open = True
+        recognizer.start_continuous_recognition()
+        print("[Azure] Streaming session opened")
+    
+    def send_audio(self, audio_data: np.ndarray):
+        """Push PCM frames into the session (reopened after an error)"""
+        if not self._session_open:
+            self._close_session()
+            self._open_session()
+        
+        try:
+            self._push_stream.write(self.audio_to_pcm_bytes(audio_data))
+        except Exception as e:
+            print(f"[Azure] Streaming send error: {e}")
+            self._session_open = False
+    
+    def stop_stream(self):
+        """Close the audio stream, wait for the last results and stop"""
+        self._close_session()
+    
+    def _close_session(self):
+        recognizer, stream, stopped = self._stream_recognizer, self._push_stream, self._session_stopped
+        if recognizer is None:
+            return
+        
+        try:
+            # End of stream lets the service finalize the last utterance
+            stream.close()
+            if self._session_open and not stopped.wait(self.FINISH_TIMEOUT):
+                print(f"[Azure] Session did not stop within {self.FINISH_TIMEOUT}s")
+            recognizer.stop_continuous_recognition()
+        except Exception as e:
+            print(f"[Azure] Error stopping stream: {e}")
+        finally:
+            self._stream_recognizer = None
+            self._push_stream = None
+            self._session_open = False
 
 
 class AliyunTranscriptionService(TranscriptionService):
     """Aliyun Bailian (DashScope) transcription service
     
     基于官方示例: example/dashscope/call_dashscope_paraformer-realtime-v2.md
+    支持流式模式：保持一个实时识别会话，持续推送PCM音频帧
     """
     
+    supports_streaming = True
+    
+    # DashScope accepts OGG-encapsulated Opus; it has no FLAC support.
+    # 'wav' is sent as raw PCM frames
+    upload_formats = ('wav', 'opus')
+    
+    # Bytes per audio frame pushed to the recognizer (same as Recognition.call)
+    FRAME_BYTES = 12800
+    
     def __init__(self):
         try:
             import dashscope
-            from dashscope.audio.asr import Recognition
+            from dashscope.audio.asr import Recognition, RecognitionCallback, RecognitionResult
+            from dashscope.common.error import InvalidParameter
             from http import HTTPStatus
             
             # 设置API Key（参考官方示例）
@@ -133,7 +462,10 @@ class AliyunTranscriptionService(TranscriptionService):
             self.model = Config.ALIYUN_MODEL
             self.sample_rate = Config.SAMPLE_RATE
             self.Recognition = Recognition
+            self.RecognitionCallback = RecognitionCallback
+            self.RecognitionResult = RecognitionResult
             self.HTTPStatus = HTTPStatus
+            self.InvalidParameter = InvalidParameter
             self.dashscope = dashscope
             
             # 性能指标记录
@@ -141,6 +473,12 @@ class AliyunTranscriptionService(TranscriptionService):
             self._total_calls = 0
             self._success_calls = 0
             
+            # 流式会话状态
+            self._stream_recognition = None
+            self._stream_sample_rate = self.sample_rate
+            self._stream_on_result = None
+            self._session_open = False
+            
             print(f"[Aliyun] Initialized with model: {self.model}")
             print(f"[Aliyun] Sample rate: {self.sample_rate} Hz")
             
@@ -161,85 +499,179 @@ class AliyunTranscriptionService(TranscriptionService):
         参考官方示例实现，支持以下特性：
         - paraformer-realtime-v2: 支持language_hints（中英文混合）
         - fun-asr-realtime-2025-11-07: 最新模型
+        
+        音频在内存中直接以帧的形式推送给识别会话（不写临时文件）
         """
         self._total_calls += 1
         
         try:
-            import tempfile
-            import os
-            
-            # Convert to WAV bytes
-            wav_bytes = self.audio_to_wav_bytes(audio_data, sample_rate)
+            # 协商为opus时推送OGG/Opus，否则推送原始PCM（无需WAV头）
+            if self.upload_encoder.name == 'opus':
+                audio_format = 'opus'
+                rate = self.upload_encoder.output_rate(sample_rate)
+                audio_bytes = self.encode_upload(audio_data, sample_rate)
+            else:
+                audio_format = 'pcm'
+                rate = sample_rate
+                audio_bytes = self.audio_to_pcm_bytes(audio_data)
             
-            # 创建临时文件保存音频数据
-            # 使用with语句确保文件正确关闭
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_file.write(wav_bytes)
-                temp_file_path = temp_file.name
+            # 每个音频块使用新的Recognition对象（每次start()本来就会新建连接，复用无收益）
+            callback = self._create_chunk_callback()
+            recognition = self._create_recognition(audio_format, rate, callback=callback)
             
+            latency.stamp('send')
+            recognition.start()
+            view = memoryview(audio_bytes)
+            for offset in range(0, len(view), self.FRAME_BYTES):
+                if callback.error is not None:
+                    break
+                recognition.send_audio_frame(view[offset:offset + self.FRAME_BYTES])
             try:
-                # 根据模型选择是否使用language_hints
-                # 参考官方示例："language_hints"只支持paraformer-realtime-v2模型
-                if self.model == 'paraformer-realtime-v2':
-                    recognition = self.Recognition(
-                        model=self.model,
-                        format='wav',
-                        sample_rate=sample_rate,
-                        language_hints=['zh', 'en'],  # 中英文混合识别
-                        callback=None
-                    )
-                else:
-                    # 其他模型（如fun-asr-realtime-2025-11-07）不使用language_hints
-                    recognition = self.Recognition(
-                        model=self.model,
-                        format='wav',
-                        sample_rate=sample_rate,
-                        callback=None
-                    )
-                
-                # 调用识别API（参考官方示例）
-                result = recognition.call(temp_file_path)
-                
-                # 检查识别结果（参考官方示例的错误处理）
-                if result.status_code == self.HTTPStatus.OK:
-                    self._success_calls += 1
-                    
-                    # 获取识别文本（使用官方推荐的get_sentence()方法）
-                    text = result.get_sentence()
-                    
-                    # 打印性能指标（参考官方示例的Metric输出）
-                    if self._first_call:
-                        print(
-                            f'[Aliyun Metric] requestId: {recognition.get_last_request_id()}, '
-                            f'first package delay: {recognition.get_first_package_delay()}ms, '
-                            f'last package delay: {recognition.get_last_package_delay()}ms'
-                        )
-                        self._first_call = False
-                    
-                    # 返回识别结果
-                    if text:
-                        return text.strip()
-                    else:
-                        # 无识别结果（可能是静音或噪音）
-                        return ""
-                else:
-                    # 识别失败，输出错误信息（参考官方示例）
-                    print(f'[Aliyun Error] {result.status_code}: {result.message}')
-                    return ""
-                    
-            finally:
-                # 删除临时文件，确保资源清理
-                try:
-                    os.unlink(temp_file_path)
-                except Exception as cleanup_error:
-                    # 忽略删除文件时的错误
-                    pass
+                # 结束推送并等待服务端返回全部结果
+                recognition.stop()
+            except self.InvalidParameter:
+                # 会话已因错误结束
+                pass
+            latency.stamp('response')
+            
+            # 检查识别结果（参考官方示例的错误处理）
+            if callback.error is not None:
+                print(f'[Aliyun Error] {callback.error.status_code}: {callback.error.message}')
+                return self._fail(f'{callback.error.status_code}: {callback.error.message}')
+            self._success_calls += 1
+            
+            # 打印性能指标（参考官方示例的Metric输出）
+            if self._first_call:
+                print(
+                    f'[Aliyun Metric] requestId: {recognition.get_last_request_id()}, '
+                    f'first package delay: {recognition.get_first_package_delay()}ms, '
+                    f'last package delay: {recognition.get_last_package_delay()}ms'
+                )
+                self._first_call = False
+            
+            # 拼接所有完整句子；无识别结果（可能是静音或噪音）时为空
+            return "".join(callback.sentences).strip()
                 
         except Exception as e:
             print(f"[Aliyun] Transcription error: {e}")
             import traceback
             traceback.print_exc()
-            return ""
+            return self._fail(e)
+    
+    def _create_chunk_callback(self):
+        """收集一次识别中所有完整句子的回调"""
+        RecognitionResult = self.RecognitionResult
+        
+        class ChunkCallback(self.RecognitionCallback):
+            def __init__(self):
+                super().__init__()
+                self.sentences = []
+                self.error = None
+            
+            def on_error(self, result):
+                self.error = result
+            
+            def on_event(self, result):
+                sentence = result.get_sentence()
+                if sentence and RecognitionResult.is_sentence_end(sentence):
+                    self.sentences.append(sentence.get('text', ''))
+        
+        return ChunkCallback()
+    
+    def _create_recognition(self, audio_format: str, sample_rate: int, callback=None):
+        """创建Recognition对象"""
+        # 根据模型选择是否使用language_hints
+        # 参考官方示例："language_hints"只支持paraformer-realtime-v2模型
+        if self.model == 'paraformer-realtime-v2':
+            return self.Recognition(
+                model=self.model,
+                format=audio_format,
+                sample_rate=sample_rate,
+                language_hints=['zh', 'en'],  # 中英文混合识别
+                callback=callback
+            )
+        # 其他模型（如fun-asr-realtime-2025-11-07）不使用language_hints
+        return self.Recognition(
+            model=self.model,
+            format=audio_format,
+            sample_rate=sample_rate,
+            callback=callback
+        )
+    
+    def start_stream(self, sample_rate: int, on_result):
+        """开启流式识别会话"""
+        self._stream_sample_rate = sample_rate
+        self._stream_on_result = on_result
+        self._open_session()
+    
+    def _open_session(self):
+        """创建回调并启动实时识别会话"""
+        service = self
+        RecognitionResult = self.RecognitionResult
+        
+        class StreamCallback(self.RecognitionCallback):
+            def on_open(self):
+                print("[Aliyun] Streaming session opened")
+            
+            def on_close(self):
+                service._session_open = False
+                print("[Aliyun] Streaming session closed")
+            
+            def on_error(self, result):
+                service._session_open = False
+                print(f"[Aliyun Error] Streaming: {result.message}")
+            
+            def on_event(self, result):
+                sentence = result.get_sentence()
+                if not sentence or 'text' not in sentence:
+                    return
+                text = sentence['text'].strip()
+                if text and service._stream_on_result:
+                    service._stream_on_result(text, RecognitionResult.is_sentence_end(sentence))
+        
+        self._stream_recognition = self._create_recognition(
+            'pcm', self._stream_sample_rate, callback=StreamCallback()
+        )
+        self._stream_recognition.start()
+        self._session_open = True
+    
+    def send_audio(self, audio_data: np.ndarray):
+        """推送PCM音频帧到流式会话（会话断开时自动重连）"""
+        if not self._session_open:
+            self._open_session()
+        
+        pcm = self.audio_to_pcm_bytes(audio_data)
+        try:
+            self._stream_recognition.send_audio_frame(pcm)
+        except Exception as e:
+            # SDK在约23秒静音后会自行结束会话且不回调on_close：重连后重发这一帧
+            print(f"[Aliyun] Streaming send error: {e}, reconnecting")
+            try:
+                self._open_session()
+                self._stream_recognition.send_audio_frame(pcm)
+            except Exception as e:
+                print(f"[Aliyun] Streaming send error after reconnecting: {e}")
+                self._session_open = False
+    
+    def stop_stream(self):
+        """结束流式识别会话"""
+        recognition = self._stream_recognition
+        self._stream_recognition = None
+        if recognition is None:
+            return
+        
+        try:
+            if self._session_open:
+                recognition.stop()
+            print(
+                f'[Aliyun Metric] requestId: {recognition.get_last_request_id()}, '
+                f'first package delay: {recognition.get_first_package_delay()}ms, '
+                f'last package delay: {recognition.get_last_package_delay()}ms'
+            )
+        except Exception as e:
+            print(f"[Aliyun] Error stopping stream: {e}")
+        finally:
+            self._session_open = False
     
     def get_stats(self):
         """获取统计信息"""
@@ -254,10 +686,21 @@ class AliyunTranscriptionService(TranscriptionService):
 
 
 class LocalWhisperService(TranscriptionService):
-    """Local Whisper model transcription (requires whisper package)"""
+    """Local Whisper model transcription (requires whisper package)
+    
+    In streaming mode the growing audio buffer is re-decoded every
+    LOCAL_STREAM_INTERVAL seconds and only text that consecutive decodes
+    agree on is committed (see local_streaming.py).
+    """
+    
+    # A single in-process model cannot decode several chunks in parallel
+    supports_concurrency = False
+    supports_streaming = True
     
     def __init__(self):
         self.model = None
+        self._streamer = None
+        self._stream_resampler = None
         try:
             import whisper
             print("Loading local Whisper model (this may take a while)...")
@@ -288,6 +731,7 @@ class LocalWhisperService(TranscriptionService):
         """Transcribe audio using local Whisper model"""
         # 检查模型是否已加载
         if self.model is None:
+            self._fail("model not loaded")
             return "[本地模型未安装，请在配置中安装]"
         
         try:
@@ -297,33 +741,188 @@ class LocalWhisperService(TranscriptionService):
             
             # Resample to 16kHz if needed (Whisper requirement)
             if sample_rate != 16000:
-                # Simple resampling (for production, use librosa or scipy)
                 audio_data = self._resample(audio_data, sample_rate, 16000)
             
             # Transcribe
+            latency.stamp('send')
             result = self.model.transcribe(audio_data, language="zh", fp16=False)
+            latency.stamp('response')
             return result["text"].strip()
             
         except Exception as e:
             print(f"Local Whisper transcription error: {e}")
-            return ""
+            return self._fail(e)
+    
+    def _decode_words(self, audio: np.ndarray, prompt: str) -> list:
+        """Decode 16 kHz audio into words with timestamps (streaming mode)"""
+        from local_streaming import Word
+        result = self.model.transcribe(
+            audio,
+            language="zh",
+            fp16=False,
+            word_timestamps=True,
+            initial_prompt=prompt or None,
+            condition_on_previous_text=False
+        )
+        return [
+            Word(word['start'], word['end'], word['word'])
+            for segment in result['segments']
+            for word in segment.get('words', [])
+        ]
+    
+    def start_stream(self, sample_rate: int, on_result):
+        """Start re-decoding a growing buffer in the background"""
+        if self.model is None:
+            raise RuntimeError("本地模型未安装，无法使用流式模式")
+        from local_streaming import WhisperStreamer
+        from resampler import Resampler
+        # Stateful, so chunk boundaries do not click
+        self._stream_resampler = Resampler(sample_rate, 16000)
+        self._streamer = WhisperStreamer(
+            self._decode_words,
+            on_result,
+            interval=Config.LOCAL_STREAM_INTERVAL,
+            max_buffer=Config.LOCAL_STREAM_MAX_BUFFER
+        )
+        self._streamer.start()
+        print(f"Local streaming started (decode every {Config.LOCAL_STREAM_INTERVAL}s)")
+    
+    def send_audio(self, audio_data: np.ndarray):
+        """Append audio to the streaming buffer"""
+        if audio_data.dtype != np.float32:
+            audio_data = audio_data.astype(np.float32)
+        self._streamer.push(self._stream_resampler.process(audio_data))
+    
+    def stop_stream(self):
+        """Stop streaming and emit the remaining text as a final sentence"""
+        streamer, self._streamer = self._streamer, None
+        if streamer is not None:
+            # Samples still held back by the resampling filter
+            streamer.push(self._stream_resampler.flush())
+            streamer.stop()
     
     def _resample(self, audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
-        """Simple resampling (basic implementation)"""
-        if orig_sr == target_sr:
-            return audio
-        
-        duration = len(audio) / orig_sr
-        target_length = int(duration * target_sr)
+        """Anti-aliased polyphase resampling (filter cached per rate pair)"""
+        from resampler import resample
+        return resample(audio, orig_sr, target_sr)
+
+
+class FasterWhisperService(LocalWhisperService):
+    """Local Whisper on CTranslate2 (requires faster-whisper package)
+    
+    Runs int8-quantized weights on the CPU, fast enough for small/medium
+    models in real time. Model size, device, compute type, CPU threads and
+    beam size come from the FASTER_WHISPER_* settings.
+    """
+    
+    def __init__(self):
+        self.model = None
+        self._streamer = None
+        self._stream_resampler = None
+        self.beam_size = Config.FASTER_WHISPER_BEAM_SIZE
+        try:
+            from faster_whisper import WhisperModel
+            cpu_threads = Config.FASTER_WHISPER_CPU_THREADS or os.cpu_count() or 4
+            print(f"Loading faster-whisper model '{Config.FASTER_WHISPER_MODEL}' "
+                  f"({Config.FASTER_WHISPER_DEVICE}, {Config.FASTER_WHISPER_COMPUTE_TYPE}, "
+                  f"{cpu_threads} threads)...")
+            self.model = WhisperModel(
+                Config.FASTER_WHISPER_MODEL,
+                device=Config.FASTER_WHISPER_DEVICE,
+                compute_type=Config.FASTER_WHISPER_COMPUTE_TYPE,
+                cpu_threads=cpu_threads
+            )
+            print("faster-whisper model loaded successfully")
+        except ImportError:
+            print("=" * 60)
+            print("[WARNING] faster-whisper未安装")
+            print("=" * 60)
+            print()
+            print("请安装faster-whisper:")
+            print("  pip install faster-whisper")
+            print()
+            print("=" * 60)
+            # 不抛出异常，让程序继续运行
+        except Exception as e:
+            print(f"加载faster-whisper模型时出错: {e}")
+    
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int) -> str:
+        """Transcribe audio using faster-whisper"""
+        if self.model is None:
+            self._fail("model not loaded")
+            return "[本地模型未安装，请安装faster-whisper]"
         
-        # Linear interpolation
-        indices = np.linspace(0, len(audio) - 1, target_length)
-        return np.interp(indices, np.arange(len(audio)), audio).astype(np.float32)
+        try:
+            if audio_data.dtype != np.float32:
+                audio_data = audio_data.astype(np.float32)
+            if sample_rate != 16000:
+                audio_data = self._resample(audio_data, sample_rate, 16000)
+            
+            latency.stamp('send')
+            # Segments are decoded lazily while iterating
+            segments, _ = self.model.transcribe(
+                audio_data,
+                language="zh",
+                beam_size=self.beam_size,
+                condition_on_previous_text=False
+            )
+            text = "".join(segment.text for segment in segments)
+            latency.stamp('response')
+            return text.strip()
+            
+        except Exception as e:
+            print(f"faster-whisper transcription error: {e}")
+            return self._fail(e)
+    
+    def _decode_words(self, audio: np.ndarray, prompt: str) -> list:
+        """Decode 16 kHz audio into words with timestamps (streaming mode)"""
+        from local_streaming import Word
+        segments, _ = self.model.transcribe(
+            audio,
+            language="zh",
+            beam_size=self.beam_size,
+            word_timestamps=True,
+            initial_prompt=prompt or None,
+            condition_on_previous_text=False
+        )
+        return [
+            Word(word.start, word.end, word.word)
+            for segment in segments
+            for word in (segment.words or [])
+        ]
 
 
 def create_transcription_service() -> TranscriptionService:
-    """Factory function to create appropriate transcription service"""
-    service_type = Config.AI_SERVICE.lower()
+    """Factory function to create appropriate transcription service
+    
+    With FALLBACK_SERVICES set, AI_SERVICE is wrapped in circuit breakers
+    that fail over along the chain; with HEDGE_SERVICE set, slow requests are
+    hedged with a second provider (see resilience.py).
+    """
+    service = _create_service(Config.AI_SERVICE)
+    
+    chain = [Config.AI_SERVICE.lower()]
+    for name in Config.FALLBACK_SERVICES.split(','):
+        name = name.strip().lower()
+        if name and name not in chain:
+            chain.append(name)
+    if len(chain) > 1:
+        from resilience import FailoverTranscriptionService
+        print(f"Failover chain: {' -> '.join(chain)}")
+        service = FailoverTranscriptionService(
+            [(chain[0], service)] + [(name, _create_service(name)) for name in chain[1:]])
+    
+    hedge_type = Config.HEDGE_SERVICE.lower()
+    if hedge_type and hedge_type != Config.AI_SERVICE.lower():
+        from resilience import HedgedTranscriptionService
+        print(f"Hedging slow requests with {hedge_type}")
+        return HedgedTranscriptionService(service, _create_service(hedge_type))
+    return service
+
+
+def _create_service(service_type: str) -> TranscriptionService:
+    """Create one provider's transcription service by name"""
+    service_type = service_type.lower()
     
     if service_type == 'openai':
         print("Using OpenAI Whisper API")
@@ -334,8 +933,17 @@ def create_transcription_service() -> TranscriptionService:
     elif service_type == 'aliyun':
         print("Using Aliyun Bailian (DashScope) Service")
         return AliyunTranscriptionService()
+    elif service_type in ('local_whisper', 'faster_whisper') and Config.LOCAL_INFERENCE_PROCESSES > 0:
+        from process_inference import ProcessInferenceService
+        service_class = LocalWhisperService if service_type == 'local_whisper' else FasterWhisperService
+        print(f"Using {service_type} in {Config.LOCAL_INFERENCE_PROCESSES} inference process(es)")
+        return ProcessInferenceService(service_class, Config.LOCAL_INFERENCE_PROCESSES)
     elif service_type == 'local_whisper':
         print("Using Local Whisper Model")
         return LocalWhisperService()
+    elif service_type == 'faster_whisper':
+        print("Using Local faster-whisper Model (CTranslate2)")
+        return FasterWhisperService()
     else:
-        raise ValueError(f"Unknown AI service: {service_type}. Choose from: openai, azure, aliyun, local_whisper")
+        raise ValueError(f"Unknown AI service: {service_type}. "
+                         f"Choose from: openai, azure, aliyun, local_whisper, faster_whisper")
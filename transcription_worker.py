@@ -0,0 +1,335 @@
+"""
+转录工作线程模块
+从音频捕获队列取出音频块并调用转录服务，不依赖Qt，可用于图形界面和无界面模式
+"""
+import threading
+import time
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import Config
+from transcript_stitcher import TranscriptStitcher
+from chunk_controller import AdaptiveChunkController
+import latency
+
+
+class TranscriptionWorker:
+    """Worker thread for audio transcription
+    
+    Results are delivered to listeners registered with add_listener():
+    on_subtitle(text) for final sentences and on_partial(text) for partial
+    sentences in streaming mode. Listeners run on the worker (or SDK) thread.
+    
+    Instead of a ready service, a ServiceLoader may be passed; the worker
+    then waits for it to finish while the capture queue keeps buffering.
+    """
+    
+    def __init__(self, audio_capture, transcription_service=None, service_loader=None):
+        self.audio_capture = audio_capture
+        self.transcription_service = transcription_service
+        self.service_loader = service_loader
+        self.running = False
+        self.thread = None
+        self.subtitle_listeners = []
+        self.partial_listeners = []
+        
+        # Overlapping windows repeat audio, so de-duplicate their transcripts
+        self.stitcher = None
+        if audio_capture.segmenter is None and audio_capture.hop_size < audio_capture.chunk_size:
+            self.stitcher = TranscriptStitcher()
+        
+        # Adaptive chunk duration (fixed-length chunks only), set up per run
+        self.chunk_controller = None
+        # Reorder window of the concurrent loop, counted as backlog by the controller
+        self._pending = None
+        
+    def add_listener(self, on_subtitle=None, on_partial=None):
+        """Register callbacks for final and partial subtitles"""
+        if on_subtitle is not None:
+            self.subtitle_listeners.append(on_subtitle)
+        if on_partial is not None:
+            self.partial_listeners.append(on_partial)
+    
+    def _publish(self, listeners, text):
+        """Call every listener, isolating failures"""
+        for listener in listeners:
+            try:
+                listener(text)
+            except Exception as e:
+                print(f"Error in subtitle listener: {e}")
+    
+    def start(self):
+        """Start transcription worker"""
+        if self.running:
+            return
+            
+        self.running = True
+        if self.stitcher is not None:
+            self.stitcher.reset()
+        self.thread = threading.Thread(target=self._process_audio, daemon=True)
+        self.thread.start()
+        
+    def stop(self):
+        """Stop transcription worker"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+        if self.transcription_service is not None:
+            try:
+                self.transcription_service.cool_down()
+            except Exception as e:
+                print(f"Error cooling down transcription service: {e}")
+        if self.chunk_controller is not None:
+            print(f"Adaptive chunk stats: {self.chunk_controller.get_stats()}")
+        self.report_latency()
+    
+    def report_latency(self):
+        """Print latency percentiles and dump them to LATENCY_LOG_FILE if set"""
+        tracker = latency.get_tracker()
+        if not tracker.recorded:
+            return
+        print("\n=== Latency (ms since capture) ===")
+        print(tracker.format_summary())
+        if Config.LATENCY_LOG_FILE:
+            try:
+                tracker.dump(Config.LATENCY_LOG_FILE)
+                print(f"Latency stats written to {Config.LATENCY_LOG_FILE}")
+            except Exception as e:
+                print(f"Error writing latency stats: {e}")
+            
+    def _wait_for_service(self):
+        """Wait for the background service loader, False if it failed or we stopped"""
+        loader = self.service_loader
+        if loader is None or self.transcription_service is not None:
+            return True
+        
+        if not loader.wait(0):
+            print("Waiting for transcription service to load (audio is being buffered)...")
+        while self.running and not loader.wait(0.5):
+            pass
+        if loader.service is None:
+            if self.running:
+                print(f"Transcription service failed to load: {loader.error}")
+            return False
+        
+        self.transcription_service = loader.service
+        return True
+    
+    def _process_audio(self):
+        """Process audio chunks and transcribe"""
+        if not self._wait_for_service():
+            return
+        
+        # e.g. open connections before the first chunk is ready
+        try:
+            self.transcription_service.warm_up(max(1, Config.TRANSCRIPTION_CONCURRENCY))
+        except Exception as e:
+            print(f"Error warming up transcription service: {e}")
+        
+        if Config.STREAMING_MODE and self.transcription_service.supports_streaming:
+            self._process_stream()
+            return
+        
+        concurrency = Config.TRANSCRIPTION_CONCURRENCY
+        if concurrency > 1 and not self.transcription_service.supports_concurrency:
+            print(f"{type(self.transcription_service).__name__} does not support "
+                  f"concurrent requests, using serial transcription")
+            concurrency = 1
+        if Config.ADAPTIVE_CHUNK and self.audio_capture.segmenter is None:
+            self.chunk_controller = AdaptiveChunkController(self.audio_capture.chunk_duration,
+                                                            concurrency=concurrency)
+            print(f"Adaptive chunk duration: {self.chunk_controller.min_duration}-"
+                  f"{self.chunk_controller.max_duration} seconds")
+            if self.chunk_controller.duration != self.audio_capture.chunk_duration:
+                self._apply_chunk_duration(self.chunk_controller.duration)
+        if concurrency > 1:
+            self._process_concurrent(concurrency)
+            return
+        
+        print("Transcription worker started")
+        
+        while self.running:
+            try:
+                # Get audio chunk from queue
+                audio_chunk, trace = self.audio_capture.get_traced_chunk(timeout=0.5)
+                
+                if audio_chunk is not None:
+                    print(f"Processing audio chunk: {len(audio_chunk)} samples")
+                    
+                    # Transcribe audio
+                    text = self._transcribe(audio_chunk, trace)
+                    
+                    self._emit_text(text, trace)
+                        
+            except Exception as e:
+                print(f"Error in transcription worker: {e}")
+                time.sleep(0.1)
+                
+        print("Transcription worker stopped")
+    
+    def _transcribe(self, audio_chunk, trace, started_at=None):
+        """Transcribe one chunk with its latency trace bound to this thread
+        
+        started_at, a one-element list, receives the time the call started.
+        """
+        latency.set_current_trace(trace)
+        started = time.monotonic()
+        if started_at is not None:
+            started_at[0] = started
+        try:
+            return self.transcription_service.transcribe(audio_chunk, Config.SAMPLE_RATE)
+        finally:
+            latency.set_current_trace(None)
+            if self.chunk_controller is not None:
+                self._adapt_chunk(len(audio_chunk), time.monotonic() - started)
+    
+    def _adapt_chunk(self, samples, rtt):
+        """Feed a round-trip time to the controller and apply its new duration"""
+        capture = self.audio_capture
+        backlog = capture.audio_queue.qsize()
+        if self._pending is not None:
+            # Chunks in the reorder window beyond the request slots are waiting too
+            backlog += max(0, len(self._pending) - self.chunk_controller.concurrency)
+        hop = capture.hop_size / capture.sample_rate if capture.hop_size < capture.chunk_size else None
+        duration = self.chunk_controller.record(samples / Config.SAMPLE_RATE, rtt, backlog, hop)
+        if duration is not None:
+            self._apply_chunk_duration(duration)
+            print(f"Chunk duration -> {duration:.1f}s (load {self.chunk_controller.load:.2f})")
+    
+    def _apply_chunk_duration(self, duration):
+        """Set the capture chunk length, keeping the configured overlap ratio"""
+        hop = None
+        if 0 < Config.CHUNK_HOP_DURATION < Config.CHUNK_DURATION:
+            hop = duration * Config.CHUNK_HOP_DURATION / Config.CHUNK_DURATION
+        self.audio_capture.set_chunk_duration(duration, hop)
+    
+    def _emit_text(self, text, trace=None):
+        """Emit signal with transcribed text"""
+        if self.stitcher is not None:
+            text = self.stitcher.stitch(text)
+        
+        tracker = latency.get_tracker()
+        if text and text.strip():
+            print(f"Transcription: {text}")
+            if trace is not None:
+                trace.stamp('emit')
+                # Recorded once the window paints it
+                tracker.mark_emitted(trace)
+            self._publish(self.subtitle_listeners, text)
+        else:
+            print("No speech detected in audio chunk")
+            if trace is not None:
+                tracker.record(trace)
+    
+    def _process_concurrent(self, concurrency):
+        """Keep up to N transcription requests in flight, emit results in capture order"""
+        print(f"Transcription worker started ({concurrency} concurrent requests)")
+        
+        window = max(Config.REORDER_WINDOW, concurrency)
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='transcribe')
+        # seq -> (future, [start time or None], trace), ordered by capture sequence
+        pending = self._pending = collections.OrderedDict()
+        next_seq = 0
+        
+        try:
+            while self.running:
+                try:
+                    if len(pending) < window:
+                        audio_chunk, trace = self.audio_capture.get_traced_chunk(
+                            timeout=0.05 if pending else 0.5
+                        )
+                        if audio_chunk is not None:
+                            print(f"Processing audio chunk #{next_seq}: {len(audio_chunk)} samples")
+                            started_at = [None]
+                            future = executor.submit(self._transcribe, audio_chunk, trace, started_at)
+                            pending[next_seq] = (future, started_at, trace)
+                            next_seq += 1
+                    else:
+                        # Reorder window full: wait for the oldest request
+                        head_future = next(iter(pending.values()))[0]
+                        wait([head_future], timeout=0.05)
+                    
+                    self._emit_in_order(pending)
+                    
+                except Exception as e:
+                    print(f"Error in transcription worker: {e}")
+                    time.sleep(0.1)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._pending = None
+        
+        print("Transcription worker stopped")
+    
+    def _emit_in_order(self, pending):
+        """Emit finished results at the head of the window, skipping stragglers"""
+        while pending:
+            seq, (future, started_at, trace) = next(iter(pending.items()))
+            # Time spent waiting for a free request slot does not count
+            started = started_at[0]
+            
+            if future.done():
+                pending.popitem(last=False)
+                try:
+                    self._emit_text(future.result(), trace)
+                except Exception as e:
+                    print(f"Error transcribing chunk #{seq}: {e}")
+            elif started is not None and time.monotonic() - started > Config.STRAGGLER_TIMEOUT:
+                # Give up on this chunk so later results are not held back
+                pending.popitem(last=False)
+                future.cancel()
+                print(f"Chunk #{seq} timed out after {Config.STRAGGLER_TIMEOUT}s, skipping")
+            else:
+                break
+    
+    def _process_stream(self):
+        """Push audio frames into one long-lived streaming session"""
+        print("Transcription worker started (streaming mode)")
+        
+        # Small frames keep the session fed with low latency; restored afterwards
+        # in case a non-streaming service takes over
+        capture = self.audio_capture
+        previous = (capture.chunk_duration, capture.hop_size / capture.sample_rate)
+        capture.set_chunk_duration(Config.STREAM_CHUNK_DURATION)
+        try:
+            self._run_stream_session()
+        finally:
+            capture.set_chunk_duration(*previous)
+        
+        print("Transcription worker stopped")
+    
+    def _run_stream_session(self):
+        """Open the session and feed it until the worker stops"""
+        try:
+            self.transcription_service.start_stream(Config.SAMPLE_RATE, self._on_stream_result)
+        except Exception as e:
+            print(f"Error starting streaming session: {e}")
+            self.running = False
+            return
+        
+        try:
+            while self.running:
+                try:
+                    audio_chunk, trace = self.audio_capture.get_traced_chunk(timeout=0.5)
+                    if audio_chunk is not None:
+                        latency.set_current_trace(trace)
+                        self.transcription_service.send_audio(audio_chunk)
+                        latency.set_current_trace(None)
+                        # Results arrive asynchronously; only capture-to-send is measured
+                        trace.stamp('send')
+                        latency.get_tracker().record(trace)
+                except Exception as e:
+                    print(f"Error in transcription worker: {e}")
+                    time.sleep(0.1)
+        finally:
+            try:
+                self.transcription_service.stop_stream()
+            except Exception as e:
+                print(f"Error stopping streaming session: {e}")
+    
+    def _on_stream_result(self, text, is_final):
+        """Forward streaming results (called from the SDK thread)"""
+        if is_final:
+            print(f"Transcription: {text}")
+            self._publish(self.subtitle_listeners, text)
+        else:
+            self._publish(self.partial_listeners, text)
@@ -0,0 +1,282 @@
+"""
+语音活动检测（VAD）模块
+在音频捕获与转录之间按语音边界切分音频，丢弃静音片段，减少API调用
+"""
+import collections
+import numpy as np
+from abc import ABC, abstractmethod
+from config import Config
+
+
+class VoiceActivityDetector(ABC):
+    """Abstract base class for frame-level voice activity detectors"""
+
+    # Frame length used by the detector (milliseconds)
+    frame_duration_ms = 30
+
+    def frame_size(self, sample_rate: int) -> int:
+        """Number of samples per analysis frame"""
+        return int(sample_rate * self.frame_duration_ms / 1000)
+
+    @abstractmethod
+    def is_speech(self, frame: np.ndarray, sample_rate: int) -> bool:
+        """Return True if the frame contains speech"""
+        pass
+
+    def reset(self):
+        """Reset internal state between sessions"""
+        pass
+
+
+class EnergyVAD(VoiceActivityDetector):
+    """Energy + zero-crossing-rate baseline detector with adaptive noise floor"""
+
+    def __init__(self, energy_ratio: float = None, min_energy: float = 1e-3):
+        self.energy_ratio = energy_ratio or Config.VAD_ENERGY_RATIO
+        self.min_energy = min_energy
+        self.noise_floor = None
+
+    def is_speech(self, frame: np.ndarray, sample_rate: int) -> bool:
+        rms = float(np.sqrt(np.mean(frame * frame)))
+        # Fraction of sign changes per sample
+        zcr = np.count_nonzero(np.diff(np.signbit(frame))) / max(len(frame) - 1, 1)
+
+        if self.noise_floor is None:
+            self.noise_floor = max(rms, self.min_energy)
+
+        threshold = max(self.noise_floor * self.energy_ratio, self.min_energy)
+        voiced = rms > threshold
+        # Unvoiced consonants: weaker energy but a high zero-crossing rate
+        unvoiced = rms > threshold * 0.5 and 0.25 < zcr < 0.6
+        speech = voiced or unvoiced
+
+        # Track noise floor: fall quickly, rise slowly, only on non-speech frames
+        if rms < self.noise_floor:
+            self.noise_floor = max(rms, self.min_energy * 0.1)
+        elif not speech:
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+
+        return speech
+
+    def reset(self):
+        self.noise_floor = None
+
+
+class WebRTCVAD(VoiceActivityDetector):
+    """WebRTC VAD (requires the webrtcvad package)"""
+
+    SUPPORTED_RATES = (8000, 16000, 32000, 48000)
+
+    def __init__(self, aggressiveness: int = None):
+        import webrtcvad
+        if aggressiveness is None:
+            aggressiveness = Config.VAD_WEBRTC_AGGRESSIVENESS
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def is_speech(self, frame: np.ndarray, sample_rate: int) -> bool:
+        if sample_rate not in self.SUPPORTED_RATES:
+            raise ValueError(f"WebRTC VAD does not support {sample_rate} Hz")
+        pcm = (np.clip(frame, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+        return self.vad.is_speech(pcm, sample_rate)
+
+
+class SileroVAD(VoiceActivityDetector):
+    """Silero VAD model running on CPU (requires the silero-vad package)"""
+
+    def __init__(self, threshold: float = None):
+        import torch
+        from silero_vad import load_silero_vad
+        torch.set_num_threads(1)
+        self.torch = torch
+        self.model = load_silero_vad()
+        self.threshold = threshold if threshold is not None else Config.VAD_SILERO_THRESHOLD
+
+    def frame_size(self, sample_rate: int) -> int:
+        # Silero expects 512 samples at 16 kHz and 256 samples at 8 kHz
+        return 256 if sample_rate == 8000 else 512
+
+    def is_speech(self, frame: np.ndarray, sample_rate: int) -> bool:
+        with self.torch.no_grad():
+            prob = self.model(self.torch.from_numpy(frame), sample_rate).item()
+        return prob >= self.threshold
+
+    def reset(self):
+        self.model.reset_states()
+
+
+class SpeechSegmenter:
+    """Turn a continuous sample stream into variable-length speech segments
+
+    Segments start at the first speech frame (with a short pre-roll), end after
+    ``hangover_ms`` of continuous silence, and are force-cut at
+    ``max_segment_duration``. Segments with less than ``min_speech_ms`` of
+    speech are dropped.
+    """
+
+    def __init__(self, vad: VoiceActivityDetector, sample_rate: int,
+                 min_speech_ms: int = None, max_segment_duration: float = None,
+                 hangover_ms: int = None, preroll_ms: int = None):
+        self.vad = vad
+        self.sample_rate = sample_rate
+        self.frame_size = vad.frame_size(sample_rate)
+        frame_ms = self.frame_size * 1000 / sample_rate
+
+        min_speech_ms = Config.VAD_MIN_SPEECH_MS if min_speech_ms is None else min_speech_ms
+        max_segment_duration = (Config.VAD_MAX_SEGMENT_DURATION
+                                if max_segment_duration is None else max_segment_duration)
+        hangover_ms = Config.VAD_HANGOVER_MS if hangover_ms is None else hangover_ms
+        preroll_ms = Config.VAD_PREROLL_MS if preroll_ms is None else preroll_ms
+
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.max_segment_frames = max(1, int(max_segment_duration * 1000 / frame_ms))
+        self.hangover_frames = max(1, int(hangover_ms / frame_ms))
+        self.preroll = collections.deque(maxlen=max(0, int(preroll_ms / frame_ms)))
+
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._segment = []
+        self._in_speech = False
+        self._speech_frames = 0
+        self._silence_run = 0
+        # Stream position (in samples) of the next frame and of the pending segment
+        self._position = 0
+        self._segment_start = 0
+
+        # 统计信息
+        self.segments_emitted = 0
+        self.segments_dropped = 0
+        self.silence_dropped_seconds = 0.0
+
+    def process(self, audio: np.ndarray) -> list:
+        """Feed samples, return the list of completed speech segments"""
+        return [segment for _, segment in self.process_timed(audio)]
+
+    def process_timed(self, audio: np.ndarray) -> list:
+        """Feed samples, return [(start_sample, segment)] for completed segments
+
+        start_sample counts samples since the segmenter was created or reset.
+        """
+        if len(self._remainder):
+            audio = np.concatenate((self._remainder, audio))
+
+        segments = []
+        n_frames = len(audio) // self.frame_size
+        for i in range(n_frames):
+            frame = audio[i * self.frame_size:(i + 1) * self.frame_size]
+            start = self._segment_start
+            segment = self._process_frame(frame)
+            self._position += self.frame_size
+            if segment is not None:
+                segments.append((start, segment))
+
+        self._remainder = audio[n_frames * self.frame_size:].copy()
+        return segments
+
+    def _process_frame(self, frame: np.ndarray):
+        speech = self.vad.is_speech(frame, self.sample_rate)
+
+        if not self._in_speech:
+            if not speech:
+                if len(self.preroll) == self.preroll.maxlen:
+                    self.silence_dropped_seconds += self.frame_size / self.sample_rate
+                self.preroll.append(frame)
+                return None
+            # Speech onset: include pre-roll so the first syllable is not clipped
+            self._in_speech = True
+            self._segment_start = self._position - len(self.preroll) * self.frame_size
+            self._segment = list(self.preroll)
+            self.preroll.clear()
+            self._speech_frames = 0
+            self._silence_run = 0
+
+        self._segment.append(frame)
+        if speech:
+            self._speech_frames += 1
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+
+        if self._silence_run >= self.hangover_frames:
+            return self._finish_segment(in_speech=False)
+        if len(self._segment) >= self.max_segment_frames:
+            # Force cut, speech continues in a new segment
+            return self._finish_segment(in_speech=True)
+        return None
+
+    def _finish_segment(self, in_speech: bool):
+        frames = self._segment
+        speech_frames = self._speech_frames
+        # A force-cut segment continues right after the current frame
+        self._segment_start = self._position + self.frame_size
+        self._segment = []
+        self._speech_frames = 0
+        self._silence_run = 0
+        self._in_speech = in_speech
+
+        if speech_frames < self.min_speech_frames:
+            self.segments_dropped += 1
+            self.silence_dropped_seconds += len(frames) * self.frame_size / self.sample_rate
+            return None
+
+        self.segments_emitted += 1
+        return np.concatenate(frames)
+
+    def flush(self):
+        """Emit the pending segment (if any) at end of stream"""
+        return self.flush_timed()[1]
+
+    def flush_timed(self):
+        """Like flush(), returning (start_sample, segment) or (None, None)"""
+        start, segment = None, None
+        if self._in_speech and self._segment:
+            start = self._segment_start
+            segment = self._finish_segment(in_speech=False)
+        self.reset()
+        return (start, segment) if segment is not None else (None, None)
+
+    def reset(self):
+        """Discard all pending audio and detector state"""
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._segment = []
+        self._in_speech = False
+        self._speech_frames = 0
+        self._silence_run = 0
+        self._position = 0
+        self._segment_start = 0
+        self.preroll.clear()
+        self.vad.reset()
+
+    def get_stats(self):
+        """获取VAD统计信息"""
+        return {
+            'segments_emitted': self.segments_emitted,
+            'segments_dropped': self.segments_dropped,
+            'silence_dropped_seconds': round(self.silence_dropped_seconds, 2)
+        }
+
+
+def create_vad(mode: str = None):
+    """Factory function to create a voice activity detector (None when disabled)"""
+    mode = (mode or Config.VAD_MODE).lower()
+
+    if mode in ('', 'off', 'none'):
+        return None
+    if mode == 'energy':
+        print("Using energy VAD")
+        return EnergyVAD()
+    if mode == 'webrtc':
+        try:
+            vad = WebRTCVAD()
+            print("Using WebRTC VAD")
+            return vad
+        except ImportError:
+            print("[WARNING] webrtcvad未安装 (pip install webrtcvad)，改用能量VAD")
+            return EnergyVAD()
+    if mode == 'silero':
+        try:
+            vad = SileroVAD()
+            print("Using Silero VAD")
+            return vad
+        except ImportError:
+            print("[WARNING] silero-vad未安装 (pip install silero-vad)，改用能量VAD")
+            return EnergyVAD()
+    raise ValueError(f"Unknown VAD mode: {mode}. Choose from: off, energy, webrtc, silero")